@@ -1,14 +1,32 @@
 #!/usr/bin/python3
 
 import asyncio
+import contextlib
+import heapq
+import itertools
 import os
 import re
 import json
 from datetime import datetime, timezone
-from typing import Dict, List, Any
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 import aiohttp
 
+from github_stats import DailyContributions, Queries, StateStore
+
+
+# Seconds the run may spend collecting before falling back to the snapshot
+RUN_DEADLINE = 90.0
+# Seconds metrics that missed the deadline may keep running after the badges
+# are written, so that the next run can use them
+BACKGROUND_GRACE = 120.0
+# Metrics collected separately; when connections are scarce, requests of
+# lower-numbered (more important) metrics are sent first
+METRIC_PRIORITIES = {'profile': 0, 'contributions': 1, 'repositories': 2, 'calendar': 3}
+# Metrics whose badge fields have a placeholder, so that the badges are still
+# published without them
+OPTIONAL_METRICS = {'calendar'}
+
 
 ################################################################################
 # Helper Functions
@@ -23,19 +41,91 @@ def generate_output_folder() -> None:
         os.mkdir("generated")
 
 
+class PriorityLimiter:
+    """
+    Limit the number of concurrent requests, handing free slots to the most
+    important (lowest priority number) waiting request first
+    """
+    
+    def __init__(self, max_concurrent: int):
+        self.free = max_concurrent
+        self.waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self.counter = itertools.count()
+    
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: int) -> AsyncIterator[None]:
+        """Hold one request slot for the duration of the block"""
+        if self.free > 0 and not self.waiters:
+            self.free -= 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            heapq.heappush(self.waiters, (priority, next(self.counter), waiter))
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # The slot was handed over just before cancellation
+                    self.release()
+                raise
+        try:
+            yield
+        finally:
+            self.release()
+    
+    def release(self) -> None:
+        """Hand a slot to the next waiting request, or free it"""
+        while self.waiters:
+            _, _, waiter = heapq.heappop(self.waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.free += 1
+
+
 class GitHubStatsCollector:
     """
     Enhanced GitHub statistics collector using GraphQL and REST APIs
     """
     
-    def __init__(self, username: str, session: aiohttp.ClientSession):
+    def __init__(
+        self,
+        username: str,
+        session: aiohttp.ClientSession,
+        cache_dir: Optional[str] = None,
+        deadline: float = RUN_DEADLINE,
+        max_connections: int = 4
+    ):
         self.username = username
         self.session = session
         self.base_url = "https://api.github.com"
         self.graphql_url = "https://api.github.com/graphql"
+        self.deadline = deadline
+        self.limiter = PriorityLimiter(max_connections)
+        self.state = StateStore(cache_dir)
+        self.snapshot: Dict[str, Dict[str, Any]] = self.state.load('stats_snapshot', {})
+        self.background: Dict[str, asyncio.Future] = {}
+    
+    async def post_graphql(
+        self, query: str, variables: Dict[str, Any], priority: int
+    ) -> Dict[str, Any]:
+        """Run a GraphQL query about the user, returning {} on failure"""
+        try:
+            async with self.limiter.slot(priority):
+                async with self.session.post(
+                    self.graphql_url,
+                    json={"query": query, "variables": variables}
+                ) as response:
+                    if response.status == 200:
+                        result = await response.json()
+                        return (result.get("data") or {}).get("user") or {}
+                    print(f"GraphQL API returned status {response.status}")
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"Error fetching GraphQL data: {e}")
         
-    async def get_user_graphql_data(self) -> Dict[str, Any]:
-        """Get comprehensive GitHub statistics using GraphQL"""
+        return {}
+    
+    async def get_profile_data(self) -> Dict[str, Any]:
+        """Get the user's name, account age and followers"""
         query = """
         query($username: String!) {
           user(login: $username) {
@@ -48,8 +138,121 @@ class GitHubStatsCollector:
             following {
               totalCount
             }
-            repositories(first: 100, orderBy: {field: UPDATED_AT, direction: DESC}) {
+          }
+        }
+        """
+        return await self.post_graphql(
+            query, {"username": self.username}, METRIC_PRIORITIES['profile']
+        )
+    
+    async def get_contributions_data(self) -> Dict[str, Any]:
+        """Get the user's contribution, pull request and issue totals"""
+        query = """
+        query($username: String!) {
+          user(login: $username) {
+            contributionsCollection {
+              totalCommitContributions
+              totalIssueContributions
+              totalPullRequestContributions
+              totalPullRequestReviewContributions
+              totalRepositoryContributions
+              contributionCalendar {
+                totalContributions
+              }
+            }
+            pullRequests(first: 100) {
+              totalCount
+            }
+            issues(first: 100) {
               totalCount
+            }
+          }
+        }
+        """
+        return await self.post_graphql(
+            query, {"username": self.username}, METRIC_PRIORITIES['contributions']
+        )
+    
+    async def get_calendar_data(self) -> Dict[str, Any]:
+        """
+        Get the user's daily contribution counts of every contribution year,
+        all years in one aliased query
+        """
+        priority = METRIC_PRIORITIES['calendar']
+        years_query = """
+        query($username: String!) {
+          user(login: $username) {
+            contributionsCollection {
+              contributionYears
+            }
+          }
+        }
+        """
+        collection = (
+            await self.post_graphql(years_query, {"username": self.username}, priority)
+        ).get('contributionsCollection')
+        if collection is None:
+            return {}
+        years = collection.get('contributionYears') or []
+        if not years:
+            return {'calendars': {}}
+        by_years = "\n".join(Queries.calendar_by_year(str(year)) for year in years)
+        calendars_query = f"""
+        query($username: String!) {{
+          user(login: $username) {{
+            {by_years}
+          }}
+        }}
+        """
+        calendars = await self.post_graphql(
+            calendars_query, {"username": self.username}, priority
+        )
+        if len(calendars) != len(years):
+            return {}
+        return {'calendars': calendars}
+    
+    async def get_connection(self, connection: str, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Page through one repository connection of the user, following
+        pageInfo.endCursor. Returns None if any page fails, since partial
+        totals would be wrong.
+        """
+        nodes: List[Dict[str, Any]] = []
+        cursor = None
+        while True:
+            data = await self.post_graphql(
+                query,
+                {"username": self.username, "cursor": cursor},
+                METRIC_PRIORITIES['repositories']
+            )
+            page = data.get(connection)
+            if not page:
+                return None
+            nodes.extend(page.get('nodes') or [])
+            page_info = page.get('pageInfo') or {}
+            if not page_info.get('hasNextPage'):
+                return {'totalCount': page.get('totalCount', len(nodes)), 'nodes': nodes}
+            cursor = page_info.get('endCursor')
+    
+    async def get_repositories_data(self) -> Dict[str, Any]:
+        """
+        Get all of the user's owned and contributed-to repositories. Both
+        connections are paged concurrently and merged into the shape of a
+        single GraphQL response for process_graphql_data.
+        """
+        owned_query = """
+        query($username: String!, $cursor: String) {
+          user(login: $username) {
+            repositories(
+                first: 100,
+                after: $cursor,
+                orderBy: {field: UPDATED_AT, direction: DESC}
+            ) {
+              totalCount
+              pageInfo {
+                hasNextPage
+                endCursor
+              }
               nodes {
                 name
                 nameWithOwner
@@ -76,50 +279,38 @@ class GitHubStatsCollector:
                 isPrivate
               }
             }
-            contributionsCollection {
-              totalCommitContributions
-              totalIssueContributions
-              totalPullRequestContributions
-              totalPullRequestReviewContributions
-              totalRepositoryContributions
-              contributionCalendar {
-                totalContributions
-              }
-            }
-            repositoriesContributedTo(first: 100, includeUserRepositories: false) {
+          }
+        }
+        """
+        contributed_query = """
+        query($username: String!, $cursor: String) {
+          user(login: $username) {
+            repositoriesContributedTo(
+                first: 100,
+                after: $cursor,
+                includeUserRepositories: false
+            ) {
               totalCount
+              pageInfo {
+                hasNextPage
+                endCursor
+              }
               nodes {
                 nameWithOwner
                 stargazerCount
                 forkCount
               }
             }
-            pullRequests(first: 100) {
-              totalCount
-            }
-            issues(first: 100) {
-              totalCount
-            }
           }
         }
         """
-        
-        variables = {"username": self.username}
-        
-        try:
-            async with self.session.post(
-                self.graphql_url,
-                json={"query": query, "variables": variables}
-            ) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    return result.get("data", {}).get("user", {})
-                else:
-                    print(f"GraphQL API returned status {response.status}")
-        except Exception as e:
-            print(f"Error fetching GraphQL data: {e}")
-        
-        return {}
+        owned, contributed = await asyncio.gather(
+            self.get_connection('repositories', owned_query),
+            self.get_connection('repositoriesContributedTo', contributed_query)
+        )
+        if owned is None or contributed is None:
+            return {}
+        return {'repositories': owned, 'repositoriesContributedTo': contributed}
     
     async def process_graphql_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Process GraphQL response into stats format"""
@@ -141,6 +332,12 @@ class GitHubStatsCollector:
         commit_contributions = contrib_data.get('totalCommitContributions', 0)
         issue_contributions = contrib_data.get('totalIssueContributions', 0)
         pr_contributions = contrib_data.get('totalPullRequestContributions', 0)
+        daily_contributions = DailyContributions.from_calendar(
+            day
+            for year in data.get('calendars', {}).values()
+            for week in (year or {}).get('contributionCalendar', {}).get('weeks', [])
+            for day in week.get('contributionDays', [])
+        )
         
         # Language statistics from GraphQL
         language_stats = {}
@@ -218,7 +415,7 @@ class GitHubStatsCollector:
             'issues_closed': total_issues // 2,  # Estimate 50% closure rate
             'pull_requests': total_prs,
             'account_age': account_age,
-            'most_active_day': 'Wednesday',
+            'most_active_day': daily_contributions.most_active_weekday() or 'Unknown',
             'languages': language_stats,
             'followers': followers,
             'following': following,
@@ -235,46 +432,79 @@ class GitHubStatsCollector:
         
         return stats
     
-    async def collect_fallback_stats(self) -> Dict[str, Any]:
-        """Fallback method with basic stats"""
-        print("⚠️  Using fallback stats with basic estimates")
-        
-        stats = {
-            'name': self.username,
-            'stars': 92,  # From previous working data
-            'forks': 2,
-            'repos': 27,
-            'contributions': 463,
-            'lines_changed': 182340,
-            'views': 920,
-            'issues_created': 108,
-            'issues_closed': 54,
-            'pull_requests': 54,
-            'account_age': '8 years',
-            'most_active_day': 'Wednesday',
-            'languages': {
-                'Python': {'size': 50000, 'prop': 40.0, 'color': '#3572A5'},
-                'Shell': {'size': 30000, 'prop': 25.0, 'color': '#89e051'},
-                'PowerShell': {'size': 20000, 'prop': 20.0, 'color': '#012456'},
-                'Dockerfile': {'size': 15000, 'prop': 15.0, 'color': '#384d54'}
+    async def collect_metric(self, metric: str) -> Dict[str, Any]:
+        """Fetch one metric, recording it in the snapshot if it succeeds"""
+        data = await getattr(self, f"get_{metric}_data")()
+        if data:
+            self.snapshot[metric] = {
+                'fetched_at': datetime.now(timezone.utc).isoformat(),
+                'data': data
             }
-        }
-        
-        return stats
+        return data
     
     async def collect_all_stats(self) -> Dict[str, Any]:
-        """Collect comprehensive GitHub statistics"""
+        """
+        Collect comprehensive GitHub statistics within the run deadline.
+        Metrics that fail or miss the deadline are taken from the last-known-good
+        snapshot and listed under 'stale'; if a metric has never been collected,
+        {} is returned so that no made-up numbers are published, unless it is
+        one of OPTIONAL_METRICS, whose fields are then shown as unknown.
+        """
         print(f"🔍 Collecting comprehensive stats for {self.username}...")
         
-        # Try GraphQL first for more accurate data
-        graphql_data = await self.get_user_graphql_data()
+        fetches = {
+            metric: asyncio.ensure_future(self.collect_metric(metric))
+            for metric in sorted(METRIC_PRIORITIES, key=METRIC_PRIORITIES.get)
+        }
+        await asyncio.wait(fetches.values(), timeout=self.deadline)
+        self.state.save('stats_snapshot', self.snapshot)
         
-        if graphql_data:
-            print("✅ Using GraphQL API for accurate statistics")
-            return await self.process_graphql_data(graphql_data)
-        else:
-            print("⚠️  GraphQL failed, using fallback stats")
-            return await self.collect_fallback_stats()
+        graphql_data: Dict[str, Any] = {}
+        stale: Dict[str, str] = {}
+        for metric, fetch in fetches.items():
+            if not fetch.done():
+                print(f"⏳ {metric} missed the {self.deadline:g}s deadline")
+                self.background[metric] = fetch
+            elif fetch.exception() is not None:
+                print(f"⚠️  {metric} could not be collected: {fetch.exception()!r}")
+            elif fetch.result():
+                graphql_data.update(fetch.result())
+                continue
+            else:
+                print(f"⚠️  {metric} could not be collected")
+            if metric not in self.snapshot:
+                if metric in OPTIONAL_METRICS:
+                    print(f"   No previous {metric} data, leaving it out")
+                    continue
+                print(f"❌ No previous {metric} data to fall back on")
+                return {}
+            graphql_data.update(self.snapshot[metric]['data'])
+            stale[metric] = self.snapshot[metric]['fetched_at']
+            print(f"   Using {metric} from {stale[metric]}")
+        
+        stats = await self.process_graphql_data(graphql_data)
+        stats['stale'] = stale
+        return stats
+    
+    async def finish_background(self, timeout: float = BACKGROUND_GRACE) -> None:
+        """
+        Let metrics that missed the deadline finish, so that the next run has
+        fresh data to fall back on
+        """
+        if not self.background:
+            return
+        print(f"⏳ Finishing {len(self.background)} slow metrics in the background...")
+        _, pending = await asyncio.wait(self.background.values(), timeout=timeout)
+        for fetch in pending:
+            fetch.cancel()
+        self.state.save('stats_snapshot', self.snapshot)
+        # A fetch that raised counts as a failed metric
+        finished = [
+            m
+            for m, f in self.background.items()
+            if f not in pending and f.exception() is None and f.result()
+        ]
+        print(f"   Updated snapshot of {', '.join(finished) or 'no metrics'}")
 
 
 def get_language_color(language: str) -> str:
@@ -409,47 +639,34 @@ async def main() -> None:
         headers["Authorization"] = f"token {access_token}"
     
     timeout = aiohttp.ClientTimeout(total=30)
+    deadline = float(os.getenv("RUN_DEADLINE", RUN_DEADLINE))
+    cache_dir = os.getenv("CACHE_DIR", ".cache")
     
     async with aiohttp.ClientSession(headers=headers, timeout=timeout) as session:
-        collector = GitHubStatsCollector(username, session)
+        collector = GitHubStatsCollector(username, session, cache_dir, deadline)
         
         try:
             stats = await collector.collect_all_stats()
             
-            await asyncio.gather(
-                generate_overview(stats),
-                generate_languages(stats)
-            )
-            
-            print("🎉 GitHub stats generated successfully!")
-            print(f"   📊 Overview: generated/overview.svg")
-            print(f"   💻 Languages: generated/languages.svg")
+            if not stats:
+                print("⚠️  Keeping the previously generated badges")
+            else:
+                await asyncio.gather(
+                    generate_overview(stats),
+                    generate_languages(stats)
+                )
+                
+                print("🎉 GitHub stats generated successfully!")
+                print(f"   📊 Overview: generated/overview.svg")
+                print(f"   💻 Languages: generated/languages.svg")
+                if stats['stale']:
+                    print(f"   ⏳ Stale metrics: {', '.join(stats['stale'])}")
             
         except Exception as e:
             print(f"❌ Error generating stats: {e}")
-            # Create fallback stats with basic info
-            fallback_stats = {
-                'name': username,
-                'stars': 0,
-                'forks': 0,
-                'repos': 0,
-                'contributions': 0,
-                'lines_changed': 0,
-                'views': 0,
-                'issues_created': 0,
-                'issues_closed': 0,
-                'pull_requests': 0,
-                'account_age': 'Unknown',
-                'most_active_day': 'Wednesday',
-                'languages': {}
-            }
-            
-            await asyncio.gather(
-                generate_overview(fallback_stats),
-                generate_languages(fallback_stats)
-            )
-            
-            print("⚠️  Generated fallback stats due to API errors")
+            print("⚠️  Keeping the previously generated badges")
+        
+        await collector.finish_background()
 
 
 if __name__ == "__main__":
@@ -4,11 +4,22 @@ import asyncio
 import os
 import re
 import json
+import sys
 from datetime import datetime, timezone
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Mapping, Optional, Tuple
 
 import aiohttp
 
+from github_stats import RateLimiter
+
+
+# Pages of 100 events fetched at most (GitHub keeps only recent events)
+MAX_EVENT_PAGES = 10
+# Seconds between event polls when GitHub does not send X-Poll-Interval
+DEFAULT_POLL_INTERVAL = 60
+# Event types counted by the poller
+COUNTED_EVENTS = ('PushEvent', 'PullRequestEvent', 'IssuesEvent')
+
 
 ################################################################################
 # Helper Functions
@@ -23,16 +34,69 @@ def generate_output_folder() -> None:
         os.mkdir("generated")
 
 
+def get_last_page(link_header: str) -> Optional[int]:
+    """
+    Get the number of the last page from a Link header, if there is one
+    """
+    match = re.search(r'<[^>]*[?&]page=(\d+)[^>]*>; rel="last"', link_header)
+    return int(match.group(1)) if match else None
+
+
+class EventLog:
+    """
+    Append-only local log of the user's events (one JSON object per line,
+    oldest first), with running counts of the event types in COUNTED_EVENTS
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.last_id: Optional[str] = None
+        self.counts = {event_type: 0 for event_type in COUNTED_EVENTS}
+        if os.path.isfile(path):
+            with open(path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        self.record(json.loads(line))
+    
+    def record(self, event: Dict[str, Any]) -> None:
+        """Update the counters and newest event ID with one event"""
+        if event.get('type') in self.counts:
+            self.counts[event['type']] += 1
+        if self.last_id is None or int(event['id']) > int(self.last_id):
+            self.last_id = event['id']
+    
+    def append(self, events: List[Dict[str, Any]]) -> None:
+        """Append events (given newest first, as returned by the API)"""
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(self.path, "a") as f:
+            for event in reversed(events):
+                f.write(json.dumps(event) + "\n")
+                self.record(event)
+
+
 class GitHubStatsCollector:
     """
     Enhanced GitHub statistics collector using GraphQL and REST APIs
     """
     
-    def __init__(self, username: str, session: aiohttp.ClientSession):
+    def __init__(
+        self,
+        username: str,
+        session: aiohttp.ClientSession,
+        max_connections: int = 10,
+        max_retries: int = 3
+    ):
         self.username = username
         self.session = session
         self.base_url = "https://api.github.com"
         self.graphql_url = "https://api.github.com/graphql"
+        self.semaphore = asyncio.Semaphore(max_connections)
+        self.max_retries = max_retries
+        self.rate_limiter = RateLimiter()
+        self.events_etag: Optional[str] = None
+        self.poll_interval = DEFAULT_POLL_INTERVAL
         
     async def get_user_info(self) -> Dict[str, Any]:
         """Get basic user information"""
@@ -70,42 +134,113 @@ class GitHubStatsCollector:
                 
         return repos
     
-    async def get_repository_languages(self, repo_name: str) -> Dict[str, int]:
-        """Get languages for a specific repository"""
-        try:
-            url = f"{self.base_url}/repos/{self.username}/{repo_name}/languages"
-            async with self.session.get(url) as response:
-                if response.status == 200:
-                    return await response.json()
-        except Exception as e:
-            print(f"Error fetching languages for {repo_name}: {e}")
-        return {}
-    
-    async def get_user_events(self) -> List[Dict[str, Any]]:
-        """Get user's recent events for contribution analysis"""
-        events = []
-        page = 1
-        
-        while page <= 10:  # Limit to avoid rate limiting
+    async def get_repository_languages(self, repo_name: str) -> Optional[Dict[str, int]]:
+        """
+        Get languages for a specific repository, or None if they cannot be
+        fetched. Requests are paced by the X-RateLimit-* and Retry-After
+        headers of earlier responses, and at most max_connections are in flight.
+        """
+        url = f"{self.base_url}/repos/{self.username}/{repo_name}/languages"
+        for _ in range(self.max_retries):
+            await self.rate_limiter.acquire("core")
             try:
-                url = f"{self.base_url}/users/{self.username}/events"
-                params = {"page": page, "per_page": 100}
-                
-                async with self.session.get(url, params=params) as response:
+                async with self.semaphore:
+                    async with self.session.get(url) as response:
+                        self.rate_limiter.update("core", response.status, response.headers)
+                        if response.status == 200:
+                            return await response.json()
+                        if not RateLimiter.is_limited(response.status, response.headers):
+                            return None
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                print(f"Error fetching languages for {repo_name}: {e}")
+                return None
+        return None
+    
+    async def get_events_page(
+        self, page: int, etag: Optional[str] = None
+    ) -> Tuple[Optional[List[Dict[str, Any]]], Mapping[str, str]]:
+        """
+        Get one page of the user's events and its headers (None on failure).
+        With etag, an unchanged page (304 Not Modified) is returned as [].
+        """
+        url = f"{self.base_url}/users/{self.username}/events"
+        params = {"page": page, "per_page": 100}
+        headers = {"If-None-Match": etag} if etag else {}
+        await self.rate_limiter.acquire("core")
+        try:
+            async with self.semaphore:
+                async with self.session.get(url, params=params, headers=headers) as response:
+                    self.rate_limiter.update("core", response.status, response.headers)
                     if response.status == 200:
-                        page_events = await response.json()
-                        if not page_events:
-                            break
-                        events.extend(page_events)
-                        page += 1
-                    else:
-                        break
-            except Exception as e:
-                print(f"Error fetching events: {e}")
+                        return await response.json(), response.headers
+                    if response.status == 304:
+                        return [], response.headers
+                    return None, response.headers
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"Error fetching events: {e}")
+        return None, {}
+    
+    async def get_user_events(
+        self, since_id: Optional[str] = None, etag: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get user's recent events for contribution analysis, newest first.
+        The first page tells how many pages there are (Link rel="last"), so
+        the rest are fetched concurrently. With since_id (the newest event
+        ID of a previous run), only newer events are returned and no further
+        pages are fetched once it is reached. With etag, the first page is
+        requested conditionally and nothing is returned if it is unchanged.
+        The ETag and X-Poll-Interval of the first page are kept for polling.
+        """
+        def newer(page_events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            if since_id is None:
+                return page_events
+            return [e for e in page_events if int(e.get('id', 0)) > int(since_id)]
+        
+        first_page, headers = await self.get_events_page(1, etag)
+        self.events_etag = headers.get('ETag', self.events_etag)
+        if headers.get('X-Poll-Interval', '').isdigit():
+            self.poll_interval = int(headers['X-Poll-Interval'])
+        if not first_page:
+            return []
+        events = newer(first_page)
+        if len(events) < len(first_page):
+            return events
+        
+        # Limit to avoid rate limiting
+        last_page = min(get_last_page(headers.get('Link', '')) or 1, MAX_EVENT_PAGES)
+        pages = await asyncio.gather(
+            *(self.get_events_page(page) for page in range(2, last_page + 1))
+        )
+        for page_events, _ in pages:
+            if not page_events:
+                # Keep the events contiguous rather than skip a missing page
+                break
+            new_events = newer(page_events)
+            events.extend(new_events)
+            if len(new_events) < len(page_events):
                 break
                 
         return events
     
+    async def poll_events(self, event_log: EventLog, max_polls: Optional[int] = None) -> None:
+        """
+        Keep appending the user's new events to event_log. Polls are
+        conditional on the ETag of the previous one, so unchanged polls are
+        304 responses that do not count against the rate limit, and they are
+        spaced by the X-Poll-Interval GitHub asks for.
+        """
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            events = await self.get_user_events(event_log.last_id, self.events_etag)
+            if events:
+                event_log.append(events)
+                counts = ", ".join(f"{t}: {n:,}" for t, n in event_log.counts.items())
+                print(f"📥 {len(events)} new events ({counts})")
+            polls += 1
+            if max_polls is None or polls < max_polls:
+                await asyncio.sleep(self.poll_interval)
+    
     async def get_user_starred_repos(self) -> int:
         """Get count of repositories user has starred"""
         try:
@@ -115,12 +250,9 @@ class GitHubStatsCollector:
             async with self.session.get(url, params=params) as response:
                 if response.status == 200:
                     # Get total count from Link header
-                    link_header = response.headers.get('Link', '')
-                    if 'rel="last"' in link_header:
-                        import re
-                        match = re.search(r'page=(\d+)>; rel="last"', link_header)
-                        if match:
-                            return int(match.group(1)) * 100  # Approximate
+                    last_page = get_last_page(response.headers.get('Link', ''))
+                    if last_page is not None:
+                        return last_page * 100  # Approximate
                     else:
                         starred = await response.json()
                         return len(starred)
@@ -132,20 +264,24 @@ class GitHubStatsCollector:
         """Get comprehensive language statistics from ALL repositories"""
         all_languages = {}
         
-        # Process ALL repositories, not just first 20
-        for i, repo in enumerate(repos):
-            if repo.get('fork', False):  # Skip forks for language stats
-                continue
-                
-            repo_name = repo['name']
-            languages = await self.get_repository_languages(repo_name)
-            
-            for lang, bytes_count in languages.items():
+        failed = []
+        
+        async def repo_languages(repo: Dict[str, Any]) -> Dict[str, int]:
+            languages = await self.get_repository_languages(repo['name'])
+            if languages is None:
+                # Repository size counts history and binaries, not code bytes,
+                # so a failed repository is left out rather than estimated
+                failed.append(repo['name'])
+                return {}
+            return languages
+        
+        # Process ALL non-fork repositories concurrently
+        fetches = [repo_languages(repo) for repo in repos if not repo.get('fork', False)]
+        for fetch in asyncio.as_completed(fetches):
+            for lang, bytes_count in (await fetch).items():
                 all_languages[lang] = all_languages.get(lang, 0) + bytes_count
-            
-            # Add small delay every 10 repos to avoid rate limiting
-            if (i + 1) % 10 == 0:
-                await asyncio.sleep(0.5)
+        if failed:
+            print(f"⚠️  Languages unavailable for {len(failed)} repos: {', '.join(sorted(failed))}")
         
         # Calculate language percentages
         total_bytes = sum(all_languages.values())
@@ -623,6 +759,12 @@ async def main() -> None:
     async with aiohttp.ClientSession(headers=headers, timeout=timeout) as session:
         collector = GitHubStatsCollector(username, session)
         
+        if sys.argv[1:2] == ["poll"]:
+            event_log = EventLog(os.getenv("EVENT_LOG", os.path.join(".cache", "events.jsonl")))
+            print(f"👀 Polling events into {event_log.path} (Ctrl+C to stop)")
+            await collector.poll_events(event_log)
+            return
+        
         try:
             stats = await collector.collect_all_stats()
             
@@ -32,6 +32,10 @@ async def generate_overview(s: Stats) -> None:
     Generate an SVG badge with summary statistics
     :param s: Represents user's GitHub statistics
     """
+    # Both fan out one request per repository as soon as each page of
+    # repositories arrives, so start them before waiting on anything else
+    per_repo = asyncio.gather(s.lines_changed, s.views)
+
     with open("templates/overview.svg", "r") as f:
         output = f.read()
 
@@ -39,9 +43,10 @@ async def generate_overview(s: Stats) -> None:
     output = re.sub("{{ stars }}", f"{await s.stargazers:,}", output)
     output = re.sub("{{ forks }}", f"{await s.forks:,}", output)
     output = re.sub("{{ contributions }}", f"{await s.total_contributions:,}", output)
-    changed = (await s.lines_changed)[0] + (await s.lines_changed)[1]
+    lines_changed, views = await per_repo
+    changed = lines_changed[0] + lines_changed[1]
     output = re.sub("{{ lines_changed }}", f"{changed:,}", output)
-    output = re.sub("{{ views }}", f"{await s.views:,}", output)
+    output = re.sub("{{ views }}", f"{views:,}", output)
     output = re.sub("{{ repos }}", f"{len(await s.repos):,}", output)
     
     # Add new statistics
@@ -54,6 +59,9 @@ async def generate_overview(s: Stats) -> None:
     
     account_age = await get_account_age(s)
     output = re.sub("{{ account_age }}", account_age, output)
+    
+    most_active_day = await get_most_active_day(s)
+    output = re.sub("{{ most_active_day }}", most_active_day, output)
 
     generate_output_folder()
     with open("generated/overview.svg", "w") as f:
@@ -108,40 +116,13 @@ fill-rule="evenodd" d="M8 4a4 4 0 100 8 4 4 0 000-8z"></path></svg>
 
 async def get_issues_stats(s: Stats) -> dict:
     """Get issues created and closed by user"""
-    created = 0
-    closed = 0
-    
-    # Get issues from user's repositories
-    for repo in await s.repos:
-        try:
-            issues = await s.queries.query_rest(f"/repos/{repo}/issues", 
-                                               {"creator": s.username, "state": "all", "per_page": 100})
-            if isinstance(issues, list):
-                for issue in issues:
-                    if issue.get("user", {}).get("login") == s.username:
-                        created += 1
-                        if issue.get("state") == "closed":
-                            closed += 1
-        except:
-            continue
-    
-    return {"created": created, "closed": closed}
+    counts = await s.issue_counts
+    return {"created": counts["issues_created"], "closed": counts["issues_closed"]}
 
 
 async def get_pull_requests_count(s: Stats) -> int:
     """Get total pull requests created by user"""
-    pr_count = 0
-    
-    for repo in await s.repos:
-        try:
-            prs = await s.queries.query_rest(f"/repos/{repo}/pulls", 
-                                            {"creator": s.username, "state": "all", "per_page": 100})
-            if isinstance(prs, list):
-                pr_count += len([pr for pr in prs if pr.get("user", {}).get("login") == s.username])
-        except:
-            continue
-    
-    return pr_count
+    return (await s.issue_counts)["pull_requests"]
 
 
 async def get_account_age(s: Stats) -> str:
@@ -161,12 +142,9 @@ async def get_account_age(s: Stats) -> str:
 
 
 async def get_most_active_day(s: Stats) -> str:
-    """Get most active day of the week"""
+    """Get most active day of the week from the contribution calendar"""
     try:
-        # This is a simplified version - in reality you'd analyze contribution patterns
-        days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-        # For now, return a placeholder
-        return "Wednesday"
+        return await s.most_active_day or "Unknown"
     except:
         return "Unknown"
 
@@ -201,6 +179,12 @@ async def main() -> None:
         not not raw_ignore_forked_repos
         and raw_ignore_forked_repos.strip().lower() != "false"
     )
+    raw_incremental = os.getenv("INCREMENTAL")
+    incremental = (
+        not not raw_incremental and raw_incremental.strip().lower() != "false"
+    )
+    # Responses and incremental state are kept here between runs
+    cache_dir = os.getenv("CACHE_DIR", ".cache")
     async with aiohttp.ClientSession() as session:
         s = Stats(
             user,
@@ -209,6 +193,8 @@ async def main() -> None:
             exclude_repos=excluded_repos,
             exclude_langs=excluded_langs,
             ignore_forked_repos=ignore_forked_repos,
+            cache_dir=cache_dir,
+            incremental=incremental,
         )
         await asyncio.gather(generate_languages(s), generate_overview(s))
 
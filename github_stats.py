@@ -1,11 +1,365 @@
 #!/usr/bin/python3
 
 import asyncio
+import calendar
+import hashlib
+import json
 import os
-from typing import Dict, List, Optional, Set, Tuple, Any, cast
+import random
+import time
+from array import array
+from datetime import date, datetime, timedelta, timezone
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+    cast,
+)
 
 import aiohttp
-import requests
+
+from response_cache import ResponseCache
+
+
+# Responses worth retrying: rate limiting and transient server-side failures
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# Bounds (in seconds) for the exponential backoff between retries
+BASE_BACKOFF = 1.0
+MAX_BACKOFF = 30.0
+# Once less than this fraction of a rate limit budget is left, requests are
+# spread out evenly over the time remaining until the budget resets
+PACE_BELOW = 0.2
+# Seconds before a repository whose traffic was forbidden (no push access) is
+# tried again, in case access has been granted since
+NO_ACCESS_RETRY_AFTER = 7 * 24 * 60 * 60
+# Limits for packing aliased fragments into one GraphQL query. GitHub allows at
+# most 500,000 nodes per query, but large queries also risk timing out.
+MAX_BATCH_ALIASES = 50
+MAX_BATCH_NODES = 50_000
+# Days into a new year before last year's contribution total is treated as final
+YEAR_SETTLE_DAYS = 7
+# Most node IDs GitHub accepts in a single nodes(ids:) query
+REFRESH_BATCH_SIZE = 100
+# Days before the newest cached day from which the contribution calendar is
+# fetched again, since recent counts can still change
+CALENDAR_REFRESH_DAYS = 14
+# Days after which a connection is paged through fully again, so that the index
+# drops repositories that left it even if as many others joined
+INDEX_FULL_PASS_DAYS = 7
+
+
+###############################################################################
+# Helper Classes
+###############################################################################
+
+
+class StateStore(object):
+    """
+    Small JSON documents persisted between runs (e.g., negative caches and
+    incremental totals). Without a directory, nothing is persisted.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+
+    def load(self, name: str, default: Any) -> Any:
+        """
+        :param name: name of the document
+        :param default: value to return if the document does not exist
+        :return: deserialized document
+        """
+        if self.directory is None:
+            return default
+        try:
+            with open(os.path.join(self.directory, f"{name}.json"), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return default
+
+    def save(self, name: str, value: Any) -> None:
+        """
+        Atomically replace a document
+        :param name: name of the document
+        :param value: JSON-serializable value to store
+        """
+        if self.directory is None:
+            return
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        path = os.path.join(self.directory, f"{name}.json")
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(value, f)
+        os.replace(f"{path}.tmp", path)
+
+
+class RepoTotals(object):
+    """
+    Running totals (stars, forks, languages) over repository overview nodes,
+    so that pages can be discarded as soon as they have been added
+    """
+
+    def __init__(self, exclude_repos: Set[str], exclude_langs: Set[str]):
+        self.exclude_repos = exclude_repos
+        self.exclude_langs_lower = {x.lower() for x in exclude_langs}
+        self.stargazers = 0
+        self.forks = 0
+        self.languages: Dict[str, Any] = dict()
+        self.repos: Set[str] = set()
+        self.pushed_at: Dict[str, Optional[str]] = dict()
+        # Follow-up queries for languages beyond the first page
+        self.followups: List["asyncio.Future[None]"] = []
+
+    def add(self, repo: Optional[Dict[str, Any]]) -> bool:
+        """
+        :param repo: repository node as returned by Queries.repos_overview
+        :return: whether the repository was counted (i.e., it is neither
+                 excluded nor already counted)
+        """
+        if repo is None:
+            return False
+        repo_name = repo.get("nameWithOwner")
+        if repo_name in self.repos or repo_name in self.exclude_repos:
+            return False
+        self.repos.add(repo_name)
+        self.pushed_at[repo_name] = repo.get("pushedAt")
+        self.stargazers += repo.get("stargazers").get("totalCount", 0)
+        self.forks += repo.get("forkCount", 0)
+
+        self.add_languages(repo.get("languages", {}).get("edges", []))
+        return True
+
+    def add_languages(self, edges: List[Dict[str, Any]]) -> None:
+        """
+        :param edges: language edges (size and language node) of one repository
+        """
+        for lang in edges:
+            lang_name = lang.get("node", {}).get("name", "Other")
+            if lang_name.lower() in self.exclude_langs_lower:
+                continue
+            if lang_name in self.languages:
+                self.languages[lang_name]["size"] += lang.get("size", 0)
+                self.languages[lang_name]["occurrences"] += 1
+            else:
+                self.languages[lang_name] = {
+                    "size": lang.get("size", 0),
+                    "occurrences": 1,
+                    "color": lang.get("node", {}).get("color"),
+                }
+
+    def proportional_languages(self) -> Dict[str, Any]:
+        """
+        :return: languages, with each one's share of the total size in "prop"
+        """
+        # TODO: Improve languages to scale by number of contributions to
+        #       specific filetypes
+        langs_total = sum([v.get("size", 0) for v in self.languages.values()])
+        for k, v in self.languages.items():
+            v["prop"] = 100 * (v.get("size", 0) / langs_total)
+        return self.languages
+
+
+class DailyContributions(object):
+    """
+    Contribution counts of consecutive days, one unsigned int per day from
+    start, so that calendars of many years stay compact and can be
+    aggregated with slice operations instead of per-day loops
+    """
+
+    def __init__(self, start: date, counts: Optional[array] = None):
+        self.start = start
+        self.counts = counts if counts is not None else array("I")
+
+    @classmethod
+    def from_calendar(cls, days: Iterable[Dict[str, Any]]) -> "DailyContributions":
+        """
+        :param days: contributionDays of a contributionCalendar, in any order
+        :return: daily counts spanning the first to the last day given, up to
+                 today
+        """
+        today = cls.today()
+        by_date = {
+            date.fromisoformat(day["date"]): day.get("contributionCount", 0)
+            for day in days
+        }
+        # Calendars can be padded with (zero) days that have not happened yet
+        by_date = {day: count for day, count in by_date.items() if day <= today}
+        if not by_date:
+            return cls(today)
+        start = min(by_date)
+        counts = array("I", [0]) * ((max(by_date) - start).days + 1)
+        for day, count in by_date.items():
+            counts[(day - start).days] = count
+        return cls(start, counts)
+
+    @staticmethod
+    def today() -> date:
+        """
+        :return: current day in UTC, the last day that can have a count
+        """
+        return datetime.now(timezone.utc).date()
+
+    @property
+    def end(self) -> date:
+        """
+        :return: last day with a count
+        """
+        return self.start + timedelta(days=max(len(self.counts) - 1, 0))
+
+    def update(self, days: Iterable[Dict[str, Any]]) -> None:
+        """
+        Overwrite the counts of the given days, extending the array if needed.
+        Days after today are dropped, including ones stored earlier.
+        :param days: contributionDays of a contributionCalendar, in any order
+        """
+        last = (self.today() - self.start).days
+        del self.counts[last + 1 :]
+        for day in days:
+            index = (date.fromisoformat(day["date"]) - self.start).days
+            if index < 0 or index > last:
+                continue
+            if index >= len(self.counts):
+                self.counts.extend(array("I", [0]) * (index + 1 - len(self.counts)))
+            self.counts[index] = day.get("contributionCount", 0)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["DailyContributions"]:
+        """
+        :param path: file written by save
+        :return: stored daily counts, or None if there are none
+        """
+        stored = array("I")
+        try:
+            with open(path, "rb") as f:
+                stored.frombytes(f.read())
+        except (OSError, ValueError):
+            return None
+        if len(stored) < 2:
+            return None
+        return cls(date.fromordinal(stored[0]), stored[1:])
+
+    def save(self, path: str) -> None:
+        """
+        Atomically store the counts, preceded by the ordinal of the first day
+        :param path: file to write
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(f"{path}.tmp", "wb") as f:
+            (array("I", [self.start.toordinal()]) + self.counts).tofile(f)
+        os.replace(f"{path}.tmp", path)
+
+    def _active_days(self) -> bytes:
+        """
+        :return: one byte per day, 1 if there were contributions and 0 if not
+        """
+        return bytes(map(bool, self.counts))
+
+    def current_streak(self) -> int:
+        """
+        :return: consecutive days with contributions up to the last day. A
+                 last day without contributions (e.g., today, so far) does
+                 not break the streak.
+        """
+        active = self._active_days()
+        if active.endswith(b"\x00"):
+            active = active[:-1]
+        return len(active) - len(active.rstrip(b"\x01"))
+
+    def longest_streak(self) -> int:
+        """
+        :return: most consecutive days with contributions
+        """
+        return max(map(len, self._active_days().split(b"\x00")), default=0)
+
+    def weekday_totals(self) -> List[int]:
+        """
+        :return: total contributions on each weekday, Monday first
+        """
+        totals = [0] * 7
+        for offset in range(7):
+            # Every seventh day from offset falls on the same weekday
+            weekday = (self.start.weekday() + offset) % 7
+            totals[weekday] = sum(self.counts[offset::7])
+        return totals
+
+    def most_active_weekday(self) -> Optional[str]:
+        """
+        :return: name of the weekday with the most contributions, or None if
+                 there are no contributions at all
+        """
+        totals = self.weekday_totals()
+        if not any(totals):
+            return None
+        return calendar.day_name[totals.index(max(totals))]
+
+
+class EndpointPlanner(object):
+    """
+    Decide which per-repository REST calls can succeed and affect the result,
+    from what GraphQL already reports about each repository
+    """
+
+    # Traffic is only visible to users who can push to a repository
+    PUSH_PERMISSIONS = {"ADMIN", "MAINTAIN", "WRITE"}
+    # GitHub returns at most this many repositories per year of contributions
+    MAX_COMMIT_REPOS = 100
+
+    def __init__(self) -> None:
+        self.permissions: Dict[str, Optional[str]] = dict()
+        # None until known, or when the list of repositories was truncated
+        self.commit_repos: Optional[Set[str]] = None
+
+    def record(self, repo: Dict[str, Any]) -> None:
+        """
+        :param repo: repository node as returned by Queries.repos_overview
+        """
+        if "viewerPermission" in repo:
+            self.permissions[repo["nameWithOwner"]] = repo["viewerPermission"]
+
+    def record_commits(self, by_year: Iterable[Dict[str, Any]]) -> None:
+        """
+        :param by_year: contributionsCollection of each year, with
+                        commitContributionsByRepository
+        """
+        commit_repos: Set[str] = set()
+        for year in by_year:
+            contributions = year.get("commitContributionsByRepository") or []
+            if len(contributions) >= self.MAX_COMMIT_REPOS:
+                # Some repositories may be missing, so nothing can be pruned
+                self.commit_repos = None
+                return
+            for contribution in contributions:
+                repository = contribution.get("repository") or {}
+                commit_repos.add(repository.get("nameWithOwner"))
+        self.commit_repos = commit_repos
+
+    def wants_traffic(self, repo: str) -> bool:
+        """
+        :param repo: name of a repository (e.g., owner/name)
+        :return: whether /traffic/views can succeed for the repository
+        """
+        return (
+            repo not in self.permissions
+            or self.permissions[repo] in self.PUSH_PERMISSIONS
+        )
+
+    def wants_contributor_stats(self, repo: str) -> bool:
+        """
+        :param repo: name of a repository (e.g., owner/name)
+        :return: whether /stats/contributors can include lines by the user
+        """
+        return self.commit_repos is None or repo in self.commit_repos
 
 
 ###############################################################################
@@ -13,6 +367,143 @@ import requests
 ###############################################################################
 
 
+class RateLimiter(object):
+    """
+    Track the remaining GitHub API budget for each rate limit class (core,
+    graphql, search) from response headers and the GraphQL rateLimit field,
+    and pace requests so the budget runs out smoothly instead of all at once.
+    One limiter is shared by every Queries object using the same token.
+    """
+
+    _shared: Dict[str, "RateLimiter"] = {}
+
+    def __init__(self, pace_below: float = PACE_BELOW):
+        self.pace_below = pace_below
+        self._budgets: Dict[str, Dict[str, float]] = {}
+        self._blocked_until: Dict[str, float] = {}
+        self._next_slot: Dict[str, float] = {}
+
+    @classmethod
+    def for_token(cls, access_token: str) -> "RateLimiter":
+        """
+        :param access_token: GitHub token the requests are authenticated with
+        :return: limiter shared by all requests made with this token
+        """
+        if access_token not in cls._shared:
+            cls._shared[access_token] = cls()
+        return cls._shared[access_token]
+
+    @staticmethod
+    def resource_for(url: str) -> str:
+        """
+        :param url: URL of a GitHub API request
+        :return: name of the rate limit class the request counts against
+        """
+        if url.rstrip("/").endswith("/graphql"):
+            return "graphql"
+        if "/search/" in url:
+            return "search"
+        return "core"
+
+    async def acquire(self, resource: str) -> None:
+        """
+        Wait until a request against the given rate limit class may be sent
+        :param resource: rate limit class of the request
+        """
+        now = time.time()
+        delay = max(0.0, self._blocked_until.get(resource, 0.0) - now)
+        budget = self._budgets.get(resource)
+        if budget is not None and budget["reset"] > now:
+            if budget["remaining"] <= 0:
+                delay = max(delay, budget["reset"] - now)
+            elif budget["remaining"] < self.pace_below * budget["limit"]:
+                interval = (budget["reset"] - now) / budget["remaining"]
+                slot = max(now, self._next_slot.get(resource, now))
+                self._next_slot[resource] = slot + interval
+                delay = max(delay, slot - now)
+            # Count this request against the budget until headers confirm it
+            budget["remaining"] -= 1
+        if delay > 0:
+            print(f"Pacing {resource} API requests. Waiting {delay:0.1f}s...")
+            await asyncio.sleep(delay)
+
+    def update(self, resource: str, status: int, headers: Mapping[str, str]) -> None:
+        """
+        Record the budget reported by the X-RateLimit-* and Retry-After headers
+        :param resource: rate limit class the request was sent against
+        :param status: HTTP status code of the response
+        :param headers: response headers
+        """
+        resource = headers.get("X-RateLimit-Resource", resource)
+        try:
+            self._budgets[resource] = {
+                "limit": float(headers["X-RateLimit-Limit"]),
+                "remaining": float(headers["X-RateLimit-Remaining"]),
+                "reset": float(headers["X-RateLimit-Reset"]),
+            }
+        except (KeyError, ValueError):
+            pass
+        if status in (403, 429):
+            retry_after = headers.get("Retry-After")
+            if retry_after is not None and retry_after.isdigit():
+                self._blocked_until[resource] = time.time() + int(retry_after)
+
+    def update_graphql(self, rate_limit: Dict[str, Any]) -> None:
+        """
+        Record the budget reported by the rateLimit field of a GraphQL query
+        :param rate_limit: contents of the rateLimit field
+        """
+        try:
+            reset = datetime.fromisoformat(
+                rate_limit["resetAt"].replace("Z", "+00:00")
+            ).timestamp()
+            budget = self._budgets.setdefault("graphql", {"limit": 5000.0})
+            budget["limit"] = float(rate_limit.get("limit", budget["limit"]))
+            budget["remaining"] = float(rate_limit["remaining"])
+            budget["reset"] = reset
+            budget["cost"] = float(rate_limit.get("cost", 1))
+        except (KeyError, TypeError, ValueError):
+            pass
+
+    @staticmethod
+    def is_limited(status: int, headers: Mapping[str, str]) -> bool:
+        """
+        :param status: HTTP status code of a response
+        :param headers: headers of the response
+        :return: whether the response was rejected because of a rate limit
+        """
+        return status == 429 or (
+            status == 403
+            and (
+                "Retry-After" in headers
+                or headers.get("X-RateLimit-Remaining") == "0"
+            )
+        )
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """
+        :return: remaining budget, limit and reset time for each rate limit
+                 class that has been seen so far
+        """
+        return {
+            resource: {
+                "limit": int(budget.get("limit", 0)),
+                "remaining": max(0, int(budget.get("remaining", 0))),
+                "reset": datetime.fromtimestamp(
+                    budget.get("reset", 0), tz=timezone.utc
+                ),
+                "blocked_until": (
+                    datetime.fromtimestamp(
+                        self._blocked_until[resource], tz=timezone.utc
+                    )
+                    if self._blocked_until.get(resource, 0) > time.time()
+                    else None
+                ),
+            }
+            for resource, budget in self._budgets.items()
+        }
+
+
 class Queries(object):
     """
     Class with functions to query the GitHub GraphQL (v4) API and the REST (v3)
@@ -25,11 +516,81 @@ class Queries(object):
         access_token: str,
         session: aiohttp.ClientSession,
         max_connections: int = 10,
+        max_retries: int = 5,
+        request_timeout: float = 30.0,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[ResponseCache] = None,
     ):
         self.username = username
         self.access_token = access_token
         self.session = session
         self.semaphore = asyncio.Semaphore(max_connections)
+        self.max_retries = max_retries
+        self.timeout = aiohttp.ClientTimeout(total=request_timeout)
+        self.rate_limiter = (
+            RateLimiter.for_token(access_token)
+            if rate_limiter is None
+            else rate_limiter
+        )
+        self.cache = cache
+        # Responses depend on what the token can see, so cached ones are kept
+        # apart for each token sharing a cache
+        self._cache_scope = hashlib.sha256(access_token.encode()).hexdigest()
+
+    @property
+    def rate_limits(self) -> Dict[str, Dict[str, Any]]:
+        """
+        :return: remaining GitHub API budget for each rate limit class
+        """
+        return self.rate_limiter.status()
+
+    async def _request(
+        self, method: str, url: str, **kwargs: Any
+    ) -> Tuple[int, Mapping[str, str], Any]:
+        """
+        Make an HTTP request, retrying transient failures (connection errors,
+        timeouts, rate limiting and 5xx responses) with exponential backoff and
+        jitter. Requests are paced by the shared rate limiter. The semaphore is
+        only held while a request is in flight, never while backing off.
+        :param method: HTTP method to use
+        :param url: URL to send the request to
+        :param kwargs: additional arguments passed to the aiohttp session
+        :return: HTTP status code (0 if no response was received), response
+                 headers and deserialized JSON output (None if there was none)
+        """
+        status: int = 0
+        headers: Mapping[str, str] = {}
+        result: Any = None
+        resource = RateLimiter.resource_for(url)
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire(resource)
+            try:
+                async with self.semaphore:
+                    async with self.session.request(
+                        method, url, timeout=self.timeout, **kwargs
+                    ) as r_async:
+                        status = r_async.status
+                        headers = r_async.headers
+                        try:
+                            result = await r_async.json(content_type=None)
+                        except ValueError:
+                            result = None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status, headers, result = 0, {}, None
+                print(f"Request failed ({type(e).__name__}). Retrying...")
+            else:
+                self.rate_limiter.update(resource, status, headers)
+                limited = self.rate_limiter.is_limited(status, headers)
+                if status not in RETRYABLE_STATUSES and not limited:
+                    return status, headers, result
+                print(f"Request returned {status}. Retrying...")
+
+            if attempt < self.max_retries:
+                # "Full jitter" keeps concurrent retries from arriving together
+                await asyncio.sleep(
+                    random.uniform(0, min(MAX_BACKOFF, BASE_BACKOFF * 2**attempt))
+                )
+        return status, headers, result
 
     async def query(self, generated_query: str) -> Dict:
         """
@@ -41,30 +602,94 @@ class Queries(object):
         headers = {
             "Authorization": f"Bearer {self.access_token}",
         }
-        try:
-            async with self.semaphore:
-                r_async = await self.session.post(
-                    "https://api.github.com/graphql",
-                    headers=headers,
-                    json={"query": generated_query},
-                )
-            result = await r_async.json()
-            if result is not None:
-                return result
-        except:
-            print("aiohttp Succeeded for GraphQL query")
-            # Fall back on non-async requests
-            async with self.semaphore:
-                r_requests = requests.post(
-                    "https://api.github.com/graphql",
-                    headers=headers,
-                    json={"query": generated_query},
+        url = "https://api.github.com/graphql"
+        cache_key = None
+        if self.cache is not None:
+            cache_key = ResponseCache.key(
+                url, [("query", generated_query)], self._cache_scope
+            )
+            cached = self.cache.get_fresh(cache_key)
+            if cached is not None:
+                return cached
+        _, _, result = await self._request(
+            "POST",
+            url,
+            headers=headers,
+            json={"query": generated_query},
+        )
+        if isinstance(result, dict):
+            rate_limit = (result.get("data") or {}).get("rateLimit")
+            if isinstance(rate_limit, dict):
+                self.rate_limiter.update_graphql(rate_limit)
+            if (
+                self.cache is not None
+                and cache_key is not None
+                and result.get("data") is not None
+                and not result.get("errors")
+            ):
+                self.cache.put(
+                    cache_key,
+                    url,
+                    result,
+                    endpoint=ResponseCache.endpoint_class(url, generated_query),
                 )
-                result = r_requests.json()
-                if result is not None:
-                    return result
+            return result
         return dict()
 
+    async def query_rest_once(
+        self, path: str, params: Optional[Dict] = None, revalidate: bool = False
+    ) -> Tuple[int, Mapping[str, str], Any]:
+        """
+        Make a single request to the REST API without retrying on 202
+        :param path: API path to query
+        :param params: Query parameters to be passed to the API
+        :param revalidate: ignore the time-to-live of a cached response (e.g.,
+                           when the data is known to have changed)
+        :return: HTTP status code, response headers (empty when served from
+                 the cache) and deserialized REST JSON output (None while
+                 GitHub is still computing a 202 response)
+        """
+        headers = {
+            "Authorization": f"token {self.access_token}",
+        }
+        if params is None:
+            params = dict()
+        if path.startswith("/"):
+            path = path[1:]
+        url = f"https://api.github.com/{path}"
+        cache_key = None
+        entry = None
+        if self.cache is not None:
+            cache_key = ResponseCache.key(url, params.items(), self._cache_scope)
+            entry = self.cache.get(cache_key)
+            if entry is not None and entry["fresh"] and not revalidate:
+                return 200, {}, entry["body"]
+            # Conditional requests answered with 304 are served from the local
+            # copy and do not count against the rate limit
+            headers.update(ResponseCache.conditional_headers(entry))
+        status, response_headers, result = await self._request(
+            "GET",
+            url,
+            headers=headers,
+            params=tuple(params.items()),
+        )
+        if status == 202:
+            return status, response_headers, None
+        if self.cache is not None and cache_key is not None:
+            if status == 304 and entry is not None:
+                self.cache.touch(cache_key)
+                return 200, response_headers, entry["body"]
+            elif status == 200:
+                self.cache.put(
+                    cache_key,
+                    url,
+                    result,
+                    endpoint=ResponseCache.endpoint_class(url),
+                    etag=response_headers.get("ETag"),
+                    last_modified=response_headers.get("Last-Modified"),
+                )
+        return status, response_headers, result
+
     async def query_rest(self, path: str, params: Optional[Dict] = None) -> Dict:
         """
         Make a request to the REST API
@@ -74,89 +699,221 @@ class Queries(object):
         """
 
         for _ in range(60):
-            headers = {
-                "Authorization": f"token {self.access_token}",
-            }
-            if params is None:
-                params = dict()
-            if path.startswith("/"):
-                path = path[1:]
-            try:
-                async with self.semaphore:
-                    r_async = await self.session.get(
-                        f"https://api.github.com/{path}",
-                        headers=headers,
-                        params=tuple(params.items()),
-                    )
-                if r_async.status == 202:
-                    # print(f"{path} returned 202. Retrying...")
-                    print(f"A path returned 202. Retrying...")
-                    await asyncio.sleep(2)
-                    continue
-
-                result = await r_async.json()
-                if result is not None:
-                    return result
-            except:
-                print("aiohttp Succeeded for rest query")
-                # Fall back on non-async requests
-                async with self.semaphore:
-                    r_requests = requests.get(
-                        f"https://api.github.com/{path}",
-                        headers=headers,
-                        params=tuple(params.items()),
-                    )
-                    if r_requests.status_code == 202:
-                        print(f"A path returned 202. Retrying...")
-                        await asyncio.sleep(2)
-                        continue
-                    elif r_requests.status_code == 200:
-                        return r_requests.json()
+            status, _, result = await self.query_rest_once(path, params)
+            if status == 202:
+                # print(f"{path} returned 202. Retrying...")
+                print(f"A path returned 202. Retrying...")
+                await asyncio.sleep(2)
+                continue
+            # Only a 202 is worth asking again; errors and empty bodies are
+            # final for this call
+            return result if result is not None else dict()
         # print(f"There were too many 202s. Data for {path} will be incomplete.")
         print("There were too many 202s. Data for this repository will be incomplete.")
         return dict()
 
+    async def query_rest_stats(
+        self,
+        paths: Union[Iterable[str], AsyncIterable[str]],
+        deadline: float = 120.0,
+        initial_delay: float = 2.0,
+        max_delay: float = 16.0,
+        revalidate: bool = False,
+    ) -> AsyncIterator[Tuple[str, int, Any]]:
+        """
+        Query GitHub statistics endpoints (which answer 202 while computing)
+        in two phases. First every path is requested once, as soon as it is
+        known, which primes the computation on GitHub's side for all of them.
+        Then only the paths that are still pending are polled in rounds, with
+        exponential backoff between rounds. No semaphore slot is held while
+        waiting on GitHub.
+        :param paths: API paths to query; may be an async iterable, in which
+                      case paths are requested while it is still producing
+        :param deadline: seconds after which pending paths are given up on
+        :param initial_delay: seconds to wait before the first polling round
+        :param max_delay: upper bound for the wait between polling rounds
+        :param revalidate: ignore the time-to-live of cached responses
+        :return: async iterator of (path, HTTP status code, deserialized REST
+                 JSON output) in completion order; errors are yielded too, so
+                 callers must check the status. Paths that miss the deadline
+                 are omitted
+        """
+        loop = asyncio.get_running_loop()
+        give_up_at = loop.time() + deadline
+        delay = initial_delay
+
+        async def attempt(path: str) -> Tuple[str, int, Any]:
+            status, _, result = await self.query_rest_once(
+                path, revalidate=revalidate
+            )
+            return path, status, result
+
+        # Priming phase: start a request for each path as soon as it arrives.
+        # Finished requests are put on the queue; None marks the end of paths.
+        primed: "asyncio.Queue[Optional[asyncio.Future[Tuple[str, int, Any]]]]"
+        primed = asyncio.Queue()
+        started: Set[str] = set()
+
+        async def prime() -> None:
+            try:
+                if isinstance(paths, AsyncIterable):
+                    async for path in paths:
+                        start(path)
+                else:
+                    for path in paths:
+                        start(path)
+            finally:
+                primed.put_nowait(None)
+
+        def start(path: str) -> None:
+            if path in started:
+                return
+            started.add(path)
+            asyncio.ensure_future(attempt(path)).add_done_callback(primed.put_nowait)
+
+        feeder = asyncio.ensure_future(prime())
+        pending = []
+        harvested = 0
+        all_started = False
+        try:
+            while not all_started or harvested < len(started):
+                done = await primed.get()
+                if done is None:
+                    all_started = True
+                    continue
+                harvested += 1
+                path, status, result = done.result()
+                if status == 202:
+                    pending.append(path)
+                else:
+                    yield path, status, result
+            # Raise any error from producing the paths
+            await feeder
+        finally:
+            feeder.cancel()
+
+        # Polling phase: only paths GitHub is still computing are retried
+        while pending:
+            remaining = give_up_at - loop.time()
+            if remaining <= 0:
+                print(
+                    f"{len(pending)} paths were still being computed by GitHub. "
+                    "Data for these repositories will be incomplete."
+                )
+                break
+            print(f"{len(pending)} paths returned 202. Retrying...")
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, max_delay)
+
+            still_pending = []
+            for next_result in asyncio.as_completed(
+                [attempt(path) for path in pending]
+            ):
+                path, status, result = await next_result
+                if status == 202:
+                    still_pending.append(path)
+                else:
+                    yield path, status, result
+            pending = still_pending
+
     @staticmethod
-    def repos_overview(
-        contrib_cursor: Optional[str] = None, owned_cursor: Optional[str] = None
-    ) -> str:
+    def repo_overview_fields() -> str:
         """
-        :return: GraphQL query with overview of user repositories
+        :return: GraphQL selection with the overview of a single repository
         """
-        return f"""{{
-  viewer {{
-    login,
-    name,
-    repositories(
-        first: 100,
-        orderBy: {{
-            field: UPDATED_AT,
-            direction: DESC
-        }},
-        isFork: false,
-        after: {"null" if owned_cursor is None else '"'+ owned_cursor +'"'}
-    ) {{
-      pageInfo {{
-        hasNextPage
-        endCursor
-      }}
-      nodes {{
+        return """
+        id
         nameWithOwner
-        stargazers {{
+        pushedAt
+        updatedAt
+        viewerPermission
+        stargazers {
           totalCount
-        }}
+        }
         forkCount
-        languages(first: 10, orderBy: {{field: SIZE, direction: DESC}}) {{
-          edges {{
+        languages(first: 10, orderBy: {field: SIZE, direction: DESC}) {
+          totalCount
+          pageInfo {
+            endCursor
+          }
+          edges {
             size
-            node {{
+            node {
               name
               color
-            }}
+            }
+          }
+        }
+"""
+
+    @staticmethod
+    def more_languages(cursor: Optional[str]) -> str:
+        """
+        :param cursor: cursor after which to continue
+        :return: GraphQL selection of the languages of a repository beyond
+                 those included in its overview
+        """
+        after = "null" if cursor is None else json.dumps(cursor)
+        return f"""languages(
+        first: 100, after: {after}, orderBy: {{field: SIZE, direction: DESC}}
+      ) {{
+        edges {{
+          size
+          node {{
+            name
+            color
           }}
         }}
+      }}"""
+
+    @classmethod
+    def page_selection(cls) -> str:
+        """
+        :return: GraphQL selection of one page of repository overviews
+        """
+        return f"""
+      totalCount
+      pageInfo {{
+        hasNextPage
+        endCursor
       }}
-    }}
+      nodes {{{cls.repo_overview_fields()}      }}
+    """
+
+    @classmethod
+    def owned_connection(
+        cls, owned_cursor: Optional[str] = None, selection: Optional[str] = None
+    ) -> str:
+        """
+        :param owned_cursor: cursor after which to continue, if any
+        :param selection: fields to select on the connection instead of one
+                          page of repository overviews
+        :return: GraphQL selection of one page of repositories owned by the user
+        """
+        return f"""
+    repositories(
+        first: 100,
+        orderBy: {{
+            field: UPDATED_AT,
+            direction: DESC
+        }},
+        isFork: false,
+        after: {"null" if owned_cursor is None else '"'+ owned_cursor +'"'}
+    ) {{{cls.page_selection() if selection is None else selection}}}
+"""
+
+    @classmethod
+    def contrib_connection(
+        cls, contrib_cursor: Optional[str] = None, selection: Optional[str] = None
+    ) -> str:
+        """
+        :param contrib_cursor: cursor after which to continue, if any
+        :param selection: fields to select on the connection instead of one
+                          page of repository overviews
+        :return: GraphQL selection of one page of repositories the user has
+                 contributed to
+        """
+        return f"""
     repositoriesContributedTo(
         first: 100,
         includeUserRepositories: false,
@@ -171,71 +928,233 @@ class Queries(object):
             PULL_REQUEST_REVIEW
         ]
         after: {"null" if contrib_cursor is None else '"'+ contrib_cursor +'"'}
+    ) {{{cls.page_selection() if selection is None else selection}}}
+"""
+
+    @staticmethod
+    def viewer_overview(connections: str) -> str:
+        """
+        :param connections: GraphQL selections of repository connections
+        :return: GraphQL query with the user's name and the given connections
+        """
+        return f"""{{
+  rateLimit {{
+    limit
+    cost
+    remaining
+    resetAt
+  }}
+  viewer {{
+    login,
+    name,
+    {connections}
+  }}
+}}
+"""
+
+    @classmethod
+    def repos_overview(
+        cls, contrib_cursor: Optional[str] = None, owned_cursor: Optional[str] = None
+    ) -> str:
+        """
+        :return: GraphQL query with overview of user repositories
+        """
+        return cls.viewer_overview(
+            cls.owned_connection(owned_cursor) + cls.contrib_connection(contrib_cursor)
+        )
+
+    @classmethod
+    def owned_repos(cls, owned_cursor: Optional[str] = None) -> str:
+        """
+        :param owned_cursor: cursor after which to continue, if any
+        :return: GraphQL query with overview of repositories owned by the user
+        """
+        return cls.viewer_overview(cls.owned_connection(owned_cursor))
+
+    @classmethod
+    def contributed_repos(cls, contrib_cursor: Optional[str] = None) -> str:
+        """
+        :param contrib_cursor: cursor after which to continue, if any
+        :return: GraphQL query with overview of repositories the user has
+                 contributed to
+        """
+        return cls.viewer_overview(cls.contrib_connection(contrib_cursor))
+
+    @classmethod
+    def repo_counts(cls) -> str:
+        """
+        :return: GraphQL query with the number of repositories in both the
+                 owned and the contributed connections
+        """
+        return cls.viewer_overview(
+            cls.owned_connection(selection="totalCount")
+            + cls.contrib_connection(selection="totalCount")
+        )
+
+    @classmethod
+    def repo_nodes(cls, ids: List[str]) -> str:
+        """
+        :param ids: GraphQL node IDs of repositories (at most 100)
+        :return: GraphQL query with overview of the given repositories
+        """
+        return f"""{{
+  rateLimit {{
+    limit
+    cost
+    remaining
+    resetAt
+  }}
+  nodes(ids: {json.dumps(ids)}) {{
+    ... on Repository {{{cls.repo_overview_fields()}    }}
+  }}
+}}
+"""
+
+    @staticmethod
+    def contrib_years() -> str:
+        """
+        :return: GraphQL query to get all years the user has been a contributor
+        """
+        return """
+query {
+  viewer {
+    contributionsCollection {
+      contributionYears
+    }
+  }
+}
+"""
+
+    @staticmethod
+    def contribs_by_year(year: str) -> str:
+        """
+        :param year: year to query for
+        :return: portion of a GraphQL query with desired info for a given year
+        """
+        return f"""
+    year{year}: contributionsCollection(
+        from: "{year}-01-01T00:00:00Z",
+        to: "{int(year) + 1}-01-01T00:00:00Z"
     ) {{
-      pageInfo {{
-        hasNextPage
-        endCursor
+      contributionCalendar {{
+        totalContributions
       }}
-      nodes {{
-        nameWithOwner
-        stargazers {{
-          totalCount
-        }}
-        forkCount
-        languages(first: 10, orderBy: {{field: SIZE, direction: DESC}}) {{
-          edges {{
-            size
-            node {{
-              name
-              color
-            }}
+    }}
+"""
+
+    @classmethod
+    def all_contribs(cls, years: List[str]) -> str:
+        """
+        :param years: list of years to get contributions for
+        :return: query to retrieve contribution information for all user years
+        """
+        by_years = "\n".join(map(cls.contribs_by_year, years))
+        return f"""
+query {{
+  viewer {{
+    {by_years}
+  }}
+}}
+"""
+
+    @staticmethod
+    def calendar_by_year(year: str) -> str:
+        """
+        :param year: year to query for
+        :return: portion of a GraphQL query with the daily contribution counts
+                 of a given year
+        """
+        return f"""
+    year{year}: contributionsCollection(
+        from: "{year}-01-01T00:00:00Z",
+        to: "{int(year) + 1}-01-01T00:00:00Z"
+    ) {{
+      contributionCalendar {{
+        weeks {{
+          contributionDays {{
+            date
+            contributionCount
           }}
         }}
       }}
     }}
+"""
+
+    @classmethod
+    def all_calendars(cls, years: List[str]) -> str:
+        """
+        :param years: list of years to get daily contributions for
+        :return: query to retrieve the daily contribution counts of all user
+                 years
+        """
+        by_years = "\n".join(map(cls.calendar_by_year, years))
+        return f"""
+query {{
+  viewer {{
+    {by_years}
   }}
 }}
 """
 
     @staticmethod
-    def contrib_years() -> str:
+    def recent_calendar(since: date) -> str:
         """
-        :return: GraphQL query to get all years the user has been a contributor
+        :param since: first day to query for
+        :return: query to retrieve the daily contribution counts from a given
+                 day until the end of today (UTC)
         """
-        return """
-query {
-  viewer {
-    contributionsCollection {
-      contributionYears
-    }
-  }
-}
+        # Without "to", the range may default to a year after "from". Ending
+        # it with today rather than now keeps the query (and its cache key)
+        # the same for every run of a day.
+        until = f"{DailyContributions.today().isoformat()}T23:59:59Z"
+        return f"""
+query {{
+  viewer {{
+    contributionsCollection(
+        from: "{since.isoformat()}T00:00:00Z",
+        to: "{until}"
+    ) {{
+      contributionCalendar {{
+        weeks {{
+          contributionDays {{
+            date
+            contributionCount
+          }}
+        }}
+      }}
+    }}
+  }}
+}}
 """
 
     @staticmethod
-    def contribs_by_year(year: str) -> str:
+    def commit_repos_by_year(year: str) -> str:
         """
         :param year: year to query for
-        :return: portion of a GraphQL query with desired info for a given year
+        :return: portion of a GraphQL query with the repositories the user
+                 committed to in a given year
         """
         return f"""
     year{year}: contributionsCollection(
         from: "{year}-01-01T00:00:00Z",
         to: "{int(year) + 1}-01-01T00:00:00Z"
     ) {{
-      contributionCalendar {{
-        totalContributions
+      commitContributionsByRepository(maxRepositories: 100) {{
+        repository {{
+          nameWithOwner
+        }}
       }}
     }}
 """
 
     @classmethod
-    def all_contribs(cls, years: List[str]) -> str:
+    def all_commit_repos(cls, years: List[str]) -> str:
         """
-        :param years: list of years to get contributions for
-        :return: query to retrieve contribution information for all user years
+        :param years: list of years to get committed-to repositories for
+        :return: query to retrieve the repositories the user committed to in
+                 all user years
         """
-        by_years = "\n".join(map(cls.contribs_by_year, years))
+        by_years = "\n".join(map(cls.commit_repos_by_year, years))
         return f"""
 query {{
   viewer {{
@@ -244,6 +1163,161 @@ query {{
 }}
 """
 
+    @staticmethod
+    def repository(name_with_owner: str, fields: str) -> str:
+        """
+        :param name_with_owner: repository to query for (e.g., owner/name)
+        :param fields: GraphQL selection to retrieve from the repository
+        :return: top-level GraphQL field selecting a single repository, meant to
+                 be batched with others by GraphQLBatcher
+        """
+        owner, name = name_with_owner.split("/", 1)
+        return f"""repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) {{
+      {fields}
+    }}"""
+
+    @staticmethod
+    def search_count(search_query: str) -> str:
+        """
+        :param search_query: issue search query (e.g., "author:x is:issue")
+        :return: top-level GraphQL field counting matching issues and pull
+                 requests, meant to be batched with others by GraphQLBatcher
+        """
+        return (
+            f"search(type: ISSUE, query: {json.dumps(search_query)}) "
+            "{ issueCount }"
+        )
+
+    @staticmethod
+    def batch(fragments: Dict[str, str]) -> str:
+        """
+        :param fragments: top-level GraphQL fields, keyed by the alias to give
+                          each of them
+        :return: query retrieving all fragments in a single request
+        """
+        aliased = "\n".join(
+            f"  {alias}: {fragment}" for alias, fragment in fragments.items()
+        )
+        return f"""
+query {{
+{aliased}
+}}
+"""
+
+
+class GraphQLBatcher(object):
+    """
+    Pack many small, independent GraphQL fragments (e.g., one per repository)
+    into as few aliased queries as GitHub's limits allow, and hand each caller
+    back the result of its own fragment. Fragments submitted in the same event
+    loop iteration are sent together.
+    """
+
+    def __init__(
+        self,
+        queries: Queries,
+        max_aliases: int = MAX_BATCH_ALIASES,
+        max_nodes: int = MAX_BATCH_NODES,
+    ):
+        self.queries = queries
+        self.max_aliases = max_aliases
+        self.max_nodes = max_nodes
+        self._pending: List[Tuple[str, int, "asyncio.Future[Any]"]] = []
+        self._flush_task: Optional["asyncio.Future[None]"] = None
+
+    def _pack(
+        self, items: List[Tuple[str, int, "asyncio.Future[Any]"]]
+    ) -> List[List[Tuple[str, int, "asyncio.Future[Any]"]]]:
+        """
+        :param items: fragments, their estimated node counts and their futures
+        :return: items split into batches that each stay within the alias and
+                 node limits
+        """
+        batches: List[List[Tuple[str, int, "asyncio.Future[Any]"]]] = []
+        batch: List[Tuple[str, int, "asyncio.Future[Any]"]] = []
+        nodes = 0
+        for item in items:
+            if batch and (
+                len(batch) >= self.max_aliases or nodes + item[1] > self.max_nodes
+            ):
+                batches.append(batch)
+                batch, nodes = [], 0
+            batch.append(item)
+            nodes += item[1]
+        if batch:
+            batches.append(batch)
+        return batches
+
+    async def _send(self, batch: List[Tuple[str, int, "asyncio.Future[Any]"]]) -> None:
+        """
+        Send one batch as a single query and resolve the futures of its items
+        :param batch: fragments, their estimated node counts and their futures
+        """
+        aliases = {f"b{i}": item for i, item in enumerate(batch)}
+        try:
+            result = await self.queries.query(
+                Queries.batch({alias: item[0] for alias, item in aliases.items()})
+            )
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            raise
+        data = result.get("data") or {}
+        failed = {
+            error.get("path", [None])[0]
+            for error in result.get("errors", [])
+            if isinstance(error, dict) and error.get("path")
+        }
+        if not data and result.get("errors"):
+            print(f"A batched GraphQL query failed: {result['errors'][:1]}")
+        for alias, (_, _, future) in aliases.items():
+            if not future.done():
+                future.set_result(None if alias in failed else data.get(alias))
+
+    async def flush(self) -> None:
+        """
+        Send every pending fragment, with batches sent concurrently
+        """
+        items, self._pending = self._pending, []
+        self._flush_task = None
+        await asyncio.gather(
+            *(self._send(batch) for batch in self._pack(items)),
+            return_exceptions=True,
+        )
+
+    async def _flush_soon(self) -> None:
+        """
+        Wait one event loop iteration for more fragments, then send them all
+        """
+        await asyncio.sleep(0)
+        await self.flush()
+
+    async def submit(self, fragment: str, nodes: int = 1) -> Any:
+        """
+        :param fragment: top-level GraphQL field to retrieve
+        :param nodes: estimated number of nodes the fragment may return, used
+                      to keep each batch under GitHub's node limit
+        :return: result of the fragment, or None if it could not be retrieved
+        """
+        future: "asyncio.Future[Any]" = asyncio.get_running_loop().create_future()
+        self._pending.append((fragment, nodes, future))
+        if self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush_soon())
+        return await future
+
+    async def run(self, fragments: List[str], nodes: int = 1) -> List[Any]:
+        """
+        :param fragments: top-level GraphQL fields to retrieve
+        :param nodes: estimated number of nodes each fragment may return
+        :return: results of the fragments, in the same order
+        """
+        return list(
+            await asyncio.gather(
+                *(self.submit(fragment, nodes) for fragment in fragments)
+            )
+        )
+
 
 class Stats(object):
     """
@@ -258,12 +1332,24 @@ class Stats(object):
         exclude_repos: Optional[Set] = None,
         exclude_langs: Optional[Set] = None,
         ignore_forked_repos: bool = False,
+        cache_dir: Optional[str] = None,
+        incremental: bool = False,
     ):
         self.username = username
+        self._incremental = incremental
         self._ignore_forked_repos = ignore_forked_repos
         self._exclude_repos = set() if exclude_repos is None else exclude_repos
         self._exclude_langs = set() if exclude_langs is None else exclude_langs
-        self.queries = Queries(username, access_token, session)
+        self.cache_dir = cache_dir
+        cache = (
+            None
+            if cache_dir is None
+            else ResponseCache(os.path.join(cache_dir, "responses.sqlite"))
+        )
+        self.queries = Queries(username, access_token, session, cache=cache)
+        self.state = StateStore(cache_dir)
+        self.batcher = GraphQLBatcher(self.queries)
+        self.planner = EndpointPlanner()
 
         self._name: Optional[str] = None
         self._stargazers: Optional[int] = None
@@ -271,8 +1357,17 @@ class Stats(object):
         self._total_contributions: Optional[int] = None
         self._languages: Optional[Dict[str, Any]] = None
         self._repos: Optional[Set[str]] = None
+        self._pushed_at: Dict[str, Optional[str]] = dict()
+        # Repositories counted so far by a running get_stats, for iter_repos
+        self._streamed_repos: List[str] = []
+        self._stream_changed = asyncio.Event()
         self._lines_changed: Optional[Tuple[int, int]] = None
         self._views: Optional[int] = None
+        self._issue_counts: Optional[Dict[str, int]] = None
+        self._contribution_years: Optional[List[str]] = None
+        self._daily_contributions: Optional[DailyContributions] = None
+        # Expensive fetches currently running, shared by concurrent awaiters
+        self._in_flight: Dict[str, "asyncio.Future[Any]"] = dict()
 
     async def to_str(self) -> str:
         """
@@ -282,7 +1377,7 @@ class Stats(object):
         formatted_languages = "\n  - ".join(
             [f"{k}: {v:0.4f}%" for k, v in languages.items()]
         )
-        lines_changed = await self.lines_changed
+        lines_changed, _ = await asyncio.gather(self.lines_changed, self.views)
         return f"""Name: {await self.name}
 Stargazers: {await self.stargazers:,}
 Forks: {await self.forks:,}
@@ -295,90 +1390,367 @@ Project page views: {await self.views:,}
 Languages:
   - {formatted_languages}"""
 
+    async def _single_flight(
+        self, key: str, func: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Run an expensive coroutine at most once at a time. Callers that arrive
+        while it is in flight await the same task instead of starting another.
+        :param key: name identifying the work being done
+        :param func: coroutine function doing the work
+        :return: result of the (shared) coroutine
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shield the shared task so that one cancelled caller does not cancel
+        # the work for everyone else awaiting it
+        return await asyncio.shield(task)
+
+    def _publish(self, totals: RepoTotals, repo: Optional[Dict[str, Any]]) -> None:
+        """
+        Add a repository node to the running totals and, if it counts, hand
+        its name to everyone iterating over iter_repos
+        :param totals: running totals of the current get_stats call
+        :param repo: repository node as returned by Queries.repos_overview
+        """
+        if not totals.add(repo):
+            return
+        assert repo is not None
+        self.planner.record(repo)
+        languages = repo.get("languages", {})
+        if languages.get("totalCount", 0) > len(languages.get("edges", [])):
+            totals.followups.append(
+                asyncio.ensure_future(self._fetch_more_languages(totals, repo))
+            )
+        self._streamed_repos.append(repo["nameWithOwner"])
+        self._stream_changed.set()
+        self._stream_changed = asyncio.Event()
+
+    async def _fetch_more_languages(
+        self, totals: RepoTotals, repo: Dict[str, Any]
+    ) -> None:
+        """
+        Fetch the languages of a repository that did not fit in its overview
+        (batched with other such repositories) and add them to the totals. The
+        node is completed in place, so an index holding it need not refetch.
+        :param totals: running totals of the current get_stats call
+        :param repo: repository node as returned by Queries.repos_overview
+        """
+        languages = repo.setdefault("languages", {})
+        cursor = languages.get("pageInfo", {}).get("endCursor")
+        result = await self.batcher.submit(
+            Queries.repository(
+                repo["nameWithOwner"], Queries.more_languages(cursor)
+            ),
+            nodes=100,
+        )
+        edges = ((result or {}).get("languages") or {}).get("edges", [])
+        totals.add_languages(edges)
+        languages["edges"] = languages.get("edges", []) + edges
+
     async def get_stats(self) -> None:
         """
-        Get lots of summary statistics using one big query. Sets many attributes
+        Get lots of summary statistics by paging through the owned and the
+        contributed repository connections concurrently. Sets many attributes
+        once all pages have been retrieved. Repositories are streamed to
+        iter_repos as each page arrives, and pages are dropped once added up.
+
+        In incremental mode, repositories are kept in a local index between
+        runs. Since both connections are ordered by UPDATED_AT, paging through
+        a connection stops at the first repository that has not been updated
+        since the index was written, and the rest is taken from the index.
         """
-        self._stargazers = 0
-        self._forks = 0
-        self._languages = dict()
-        self._repos = set()
+        totals = RepoTotals(self._exclude_repos, self._exclude_langs)
+        self._pushed_at = totals.pushed_at
+        self._streamed_repos = []
+        index: Dict[str, Dict[str, Any]] = (
+            self.state.load("repo_index", {}) if self._incremental else {}
+        )
+        empty: Dict[str, Any] = {"cutoff": None, "nodes": {}}
+        owned = index.get("repositories", empty)
+        contrib = index.get("repositoriesContributedTo", empty)
+        async def paginate(
+            connection: str,
+            make_query: Callable[[Optional[str]], str],
+            cutoff: Optional[str],
+            nodes: Dict[str, Dict[str, Any]],
+            publish: bool,
+        ) -> Tuple[Optional[str], Optional[int]]:
+            """
+            Page through one repository connection with its own cursor
+            :return: the user's name and the connection's total count
+            """
+            cursor = None
+            name = None
+            while True:
+                raw_results = await self.queries.query(make_query(cursor))
+                viewer = (raw_results or {}).get("data", {}).get("viewer", {})
+                name = viewer.get("name") or viewer.get("login", "No Name")
+                page: List[Dict[str, Any]] = []
+                repos = viewer.get(connection, {})
+                done = self._collect_page(repos, page, cutoff)
+                for repo in page:
+                    if publish:
+                        self._publish(totals, repo)
+                    if self._incremental:
+                        nodes[repo["nameWithOwner"]] = repo
+                cursor = repos.get("pageInfo", {}).get("endCursor")
+                if done or cursor is None:
+                    return name, repos.get("totalCount")
 
-        exclude_langs_lower = {x.lower() for x in self._exclude_langs}
+        def full_pass_due(known: Dict[str, Any]) -> bool:
+            """
+            :return: whether a connection of the index is due a full pass
+            """
+            last = known.get("full_pass_at", 0.0)
+            return time.time() - last >= INDEX_FULL_PASS_DAYS * 24 * 60 * 60
 
-        next_owned = None
-        next_contrib = None
-        while True:
-            raw_results = await self.queries.query(
-                Queries.repos_overview(
-                    owned_cursor=next_owned, contrib_cursor=next_contrib
-                )
+        async def sync(
+            connection: str,
+            make_query: Callable[[Optional[str]], str],
+            known: Dict[str, Any],
+            total: Optional[int],
+            publish: bool,
+        ) -> Tuple[Optional[str], Dict[str, Dict[str, Any]], float]:
+            """
+            Page through one connection down to the cutoff of the index, or
+            through all of it if that does not account for every repository
+            or the last full pass is INDEX_FULL_PASS_DAYS old
+            :return: the user's name, the connection's repository nodes and
+                     the time of the last full pass
+            """
+            cutoff = known["cutoff"] if not full_pass_due(known) else None
+            nodes: Dict[str, Dict[str, Any]] = dict()
+            name, paged_total = await paginate(
+                connection, make_query, cutoff, nodes, publish
             )
-            raw_results = raw_results if raw_results is not None else {}
-
-            self._name = raw_results.get("data", {}).get("viewer", {}).get("name", None)
-            if self._name is None:
-                self._name = (
-                    raw_results.get("data", {})
-                    .get("viewer", {})
-                    .get("login", "No Name")
-                )
+            if cutoff is None:
+                return name, nodes, time.time()
+            merged = {**known["nodes"], **nodes}
+            if total is None:
+                total = paged_total
+            if total is None or len(merged) == total:
+                return name, merged, known.get("full_pass_at", 0.0)
+            # A repository can join a connection with an updatedAt older than
+            # the cutoff (e.g., after a review on an old repository), or leave
+            # it while still being returned by nodes(ids:). Only a full pass
+            # tells which repositories the connection really has, so it
+            # replaces the index instead of being merged into it.
+            nodes = dict()
+            name, _ = await paginate(connection, make_query, None, nodes, publish)
+            return name, nodes, time.time()
 
-            contrib_repos = (
-                raw_results.get("data", {})
+        name: Optional[str] = None
+        owned_total: Optional[int] = None
+        contrib_total: Optional[int] = None
+        if self._incremental and self._can_refresh(index):
+            # Refresh known repositories by node ID instead of paging through
+            # them. Paging is only needed when the counts do not match.
+            viewer = (
+                (await self.queries.query(Queries.repo_counts()))
+                .get("data", {})
                 .get("viewer", {})
-                .get("repositoriesContributedTo", {})
             )
-            owned_repos = (
-                raw_results.get("data", {}).get("viewer", {}).get("repositories", {})
+            name = viewer.get("name") or viewer.get("login")
+            owned_refreshed, contrib_refreshed = await asyncio.gather(
+                self._refresh_nodes(owned["nodes"]),
+                self._refresh_nodes(contrib["nodes"]),
+            )
+            # Repositories missing from the refresh were deleted or are no
+            # longer accessible
+            owned = {**owned, "nodes": owned_refreshed}
+            contrib = {**contrib, "nodes": contrib_refreshed}
+            owned_total = viewer.get("repositories", {}).get("totalCount")
+            contrib_total = viewer.get("repositoriesContributedTo", {}).get(
+                "totalCount"
+            )
+
+        async def settled(
+            connection: str,
+            make_query: Callable[[Optional[str]], str],
+            known: Dict[str, Any],
+            total: Optional[int],
+            publish: bool,
+        ) -> Tuple[Optional[str], Dict[str, Dict[str, Any]], float]:
+            """
+            :return: the user's name (if paged), the connection's current
+                     repository nodes, all of which have been published, and
+                     the time of the last full pass
+            """
+            if (
+                total is not None
+                and len(known["nodes"]) == total
+                and not full_pass_due(known)
+            ):
+                result = None, known["nodes"], known.get("full_pass_at", 0.0)
+            else:
+                result = await sync(connection, make_query, known, total, publish)
+            if publish:
+                for repo in result[1].values():
+                    self._publish(totals, repo)
+            return result
+
+        # Each connection is paged independently, so the one with fewer pages
+        # finishes early instead of re-requesting its last page
+        streams = [
+            settled("repositories", Queries.owned_repos, owned, owned_total, True)
+        ]
+        if not self._ignore_forked_repos or self._incremental:
+            streams.append(
+                settled(
+                    "repositoriesContributedTo",
+                    Queries.contributed_repos,
+                    contrib,
+                    contrib_total,
+                    not self._ignore_forked_repos,
+                )
+            )
+        results = await asyncio.gather(*streams)
+        name = name or next((n for n, _, _ in results if n is not None), "No Name")
+        _, owned_nodes, owned_full_pass = results[0]
+        _, contrib_nodes, contrib_full_pass = (
+            results[1] if len(results) > 1 else (None, dict(), 0.0)
+        )
+
+        # Languages beyond the first 10 of polyglot repositories. Nodes are
+        # completed before they are indexed.
+        await asyncio.gather(*totals.followups)
+
+        if self._incremental:
+            self.state.save(
+                "repo_index",
+                {
+                    "repositories": {
+                        "cutoff": self._newest_update(owned_nodes),
+                        "full_pass_at": owned_full_pass,
+                        "nodes": owned_nodes,
+                    },
+                    "repositoriesContributedTo": {
+                        "cutoff": self._newest_update(contrib_nodes),
+                        "full_pass_at": contrib_full_pass,
+                        "nodes": contrib_nodes,
+                    },
+                },
             )
 
-            repos = owned_repos.get("nodes", [])
-            if not self._ignore_forked_repos:
-                repos += contrib_repos.get("nodes", [])
+        self._name = name
+        self._stargazers = totals.stargazers
+        self._forks = totals.forks
+        self._languages = totals.proportional_languages()
+        self._repos = totals.repos
 
+    async def iter_repos(self) -> AsyncIterator[str]:
+        """
+        Iterate over the names of the user's repositories as soon as each page
+        of them arrives, so that per-repository work can start while later
+        pages are still loading. Concurrent iterators share one pagination.
+        :return: async iterator of repository names (e.g., owner/name)
+        """
+        if self._repos is not None:
+            for repo in list(self._repos):
+                yield repo
+            return
+
+        fetch = asyncio.ensure_future(
+            self._single_flight("get_stats", self.get_stats)
+        )
+        yielded = 0
+        while True:
+            changed = self._stream_changed
+            while yielded < len(self._streamed_repos):
+                yield self._streamed_repos[yielded]
+                yielded += 1
+            if fetch.done():
+                # Raise any error from fetching
+                fetch.result()
+                if yielded >= len(self._streamed_repos):
+                    return
+                continue
+            waiter = asyncio.ensure_future(changed.wait())
+            await asyncio.wait({fetch, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+
+    @staticmethod
+    def _can_refresh(index: Dict[str, Dict[str, Any]]) -> bool:
+        """
+        :param index: local repository index written by a previous run
+        :return: whether every indexed repository can be refreshed by node ID
+        """
+        nodes = [
+            node
+            for connection in index.values()
+            for node in connection.get("nodes", {}).values()
+        ]
+        return bool(nodes) and all(node.get("id") for node in nodes)
+
+    async def _refresh_nodes(
+        self, nodes: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Refetch known repositories with nodes(ids:) queries of up to
+        REFRESH_BATCH_SIZE IDs each, sent concurrently. A refreshed repository
+        may have left its connection, so it is not published here.
+        :param nodes: indexed repository nodes, keyed by repository name
+        :return: refreshed repository nodes, keyed by repository name
+        """
+        refreshed: Dict[str, Dict[str, Any]] = dict()
+        known = list(nodes.values())
+
+        async def refresh(batch: List[Dict[str, Any]]) -> None:
+            result = await self.queries.query(
+                Queries.repo_nodes([node["id"] for node in batch])
+            )
+            data = result.get("data")
+            # Keep the indexed copies if the whole batch failed
+            repos = batch if data is None else data.get("nodes") or []
             for repo in repos:
-                if repo is None:
+                if repo is None or "nameWithOwner" not in repo:
                     continue
-                name = repo.get("nameWithOwner")
-                if name in self._repos or name in self._exclude_repos:
-                    continue
-                self._repos.add(name)
-                self._stargazers += repo.get("stargazers").get("totalCount", 0)
-                self._forks += repo.get("forkCount", 0)
-
-                for lang in repo.get("languages", {}).get("edges", []):
-                    name = lang.get("node", {}).get("name", "Other")
-                    languages = await self.languages
-                    if name.lower() in exclude_langs_lower:
-                        continue
-                    if name in languages:
-                        languages[name]["size"] += lang.get("size", 0)
-                        languages[name]["occurrences"] += 1
-                    else:
-                        languages[name] = {
-                            "size": lang.get("size", 0),
-                            "occurrences": 1,
-                            "color": lang.get("node", {}).get("color"),
-                        }
-
-            if owned_repos.get("pageInfo", {}).get(
-                "hasNextPage", False
-            ) or contrib_repos.get("pageInfo", {}).get("hasNextPage", False):
-                next_owned = owned_repos.get("pageInfo", {}).get(
-                    "endCursor", next_owned
-                )
-                next_contrib = contrib_repos.get("pageInfo", {}).get(
-                    "endCursor", next_contrib
-                )
-            else:
-                break
+                refreshed[repo["nameWithOwner"]] = repo
 
-        # TODO: Improve languages to scale by number of contributions to
-        #       specific filetypes
-        langs_total = sum([v.get("size", 0) for v in self._languages.values()])
-        for k, v in self._languages.items():
-            v["prop"] = 100 * (v.get("size", 0) / langs_total)
+        await asyncio.gather(
+            *(
+                refresh(known[i : i + REFRESH_BATCH_SIZE])
+                for i in range(0, len(known), REFRESH_BATCH_SIZE)
+            )
+        )
+        return refreshed
+
+    @staticmethod
+    def _collect_page(
+        connection: Dict[str, Any],
+        nodes: List[Dict[str, Any]],
+        cutoff: Optional[str],
+    ) -> bool:
+        """
+        Collect the repositories of one page of a connection
+        :param connection: page of a repository connection (with pageInfo)
+        :param nodes: list to append the page's repository nodes to
+        :param cutoff: updatedAt of the newest repository in the local index;
+                       older repositories are not collected
+        :return: whether paging through this connection is done
+        """
+        for repo in connection.get("nodes", []):
+            if repo is None:
+                continue
+            if cutoff is not None and repo.get("updatedAt", "") < cutoff:
+                return True
+            nodes.append(repo)
+        return not connection.get("pageInfo", {}).get("hasNextPage", False)
+
+    @staticmethod
+    def _newest_update(nodes: Dict[str, Dict[str, Any]]) -> Optional[str]:
+        """
+        :param nodes: repository nodes, keyed by repository name
+        :return: most recent updatedAt among the nodes, if any
+        """
+        return max(
+            (node["updatedAt"] for node in nodes.values() if node.get("updatedAt")),
+            default=None,
+        )
 
     @property
     async def name(self) -> str:
@@ -387,7 +1759,7 @@ Languages:
         """
         if self._name is not None:
             return self._name
-        await self.get_stats()
+        await self._single_flight("get_stats", self.get_stats)
         assert self._name is not None
         return self._name
 
@@ -398,7 +1770,7 @@ Languages:
         """
         if self._stargazers is not None:
             return self._stargazers
-        await self.get_stats()
+        await self._single_flight("get_stats", self.get_stats)
         assert self._stargazers is not None
         return self._stargazers
 
@@ -409,7 +1781,7 @@ Languages:
         """
         if self._forks is not None:
             return self._forks
-        await self.get_stats()
+        await self._single_flight("get_stats", self.get_stats)
         assert self._forks is not None
         return self._forks
 
@@ -420,7 +1792,7 @@ Languages:
         """
         if self._languages is not None:
             return self._languages
-        await self.get_stats()
+        await self._single_flight("get_stats", self.get_stats)
         assert self._languages is not None
         return self._languages
 
@@ -430,7 +1802,7 @@ Languages:
         :return: summary of languages used by the user, with proportional usage
         """
         if self._languages is None:
-            await self.get_stats()
+            await self._single_flight("get_stats", self.get_stats)
             assert self._languages is not None
 
         return {k: v.get("prop", 0) for (k, v) in self._languages.items()}
@@ -442,19 +1814,15 @@ Languages:
         """
         if self._repos is not None:
             return self._repos
-        await self.get_stats()
+        await self._single_flight("get_stats", self.get_stats)
         assert self._repos is not None
         return self._repos
 
-    @property
-    async def total_contributions(self) -> int:
+    async def get_contribution_years(self) -> None:
         """
-        :return: count of user's total contributions as defined by GitHub
+        Get the years in which the user has contributed. Sets
+        _contribution_years
         """
-        if self._total_contributions is not None:
-            return self._total_contributions
-
-        self._total_contributions = 0
         years = (
             (await self.queries.query(Queries.contrib_years()))
             .get("data", {})
@@ -462,63 +1830,348 @@ Languages:
             .get("contributionsCollection", {})
             .get("contributionYears", [])
         )
+        self._contribution_years = [str(year) for year in years]
+
+    @property
+    async def contribution_years(self) -> List[str]:
+        """
+        :return: years in which the user has contributed
+        """
+        if self._contribution_years is not None:
+            return self._contribution_years
+        await self._single_flight("contribution_years", self.get_contribution_years)
+        assert self._contribution_years is not None
+        return self._contribution_years
+
+    async def get_daily_contributions(self) -> None:
+        """
+        Get the user's contribution count of every day. Counts are kept
+        between runs, so that only the newest weeks of the calendar are
+        queried; otherwise every year is fetched in one query. Sets
+        _daily_contributions
+        """
+        path = (
+            os.path.join(self.cache_dir, "daily_contributions.bin")
+            if self.cache_dir is not None
+            else None
+        )
+        daily = DailyContributions.load(path) if path is not None else None
+        today = DailyContributions.today()
+        # A single contributionsCollection may span at most a year
+        if (
+            daily is not None
+            and (today - daily.end).days + CALENDAR_REFRESH_DAYS < 365
+        ):
+            since = min(daily.end, today) - timedelta(days=CALENDAR_REFRESH_DAYS)
+            recent = (
+                (await self.queries.query(Queries.recent_calendar(since)))
+                .get("data", {})
+                .get("viewer", {})
+                .get("contributionsCollection", {})
+                .get("contributionCalendar", {})
+                .get("weeks", [])
+            )
+            daily.update(day for week in recent for day in week["contributionDays"])
+        else:
+            years = await self.contribution_years
+            by_year = (
+                (await self.queries.query(Queries.all_calendars(years)))
+                .get("data", {})
+                .get("viewer", {})
+                if years
+                else dict()
+            )
+            daily = DailyContributions.from_calendar(
+                day
+                for year in by_year.values()
+                for week in (year or {})
+                .get("contributionCalendar", {})
+                .get("weeks", [])
+                for day in week.get("contributionDays", [])
+            )
+        if path is not None and len(daily.counts) > 0:
+            daily.save(path)
+        self._daily_contributions = daily
+
+    @property
+    async def daily_contributions(self) -> DailyContributions:
+        """
+        :return: the user's contribution count of every day
+        """
+        if self._daily_contributions is not None:
+            return self._daily_contributions
+        await self._single_flight("daily_contributions", self.get_daily_contributions)
+        assert self._daily_contributions is not None
+        return self._daily_contributions
+
+    @property
+    async def most_active_day(self) -> Optional[str]:
+        """
+        :return: weekday on which the user has contributed the most, or None
+                 if the user has no contributions
+        """
+        return (await self.daily_contributions).most_active_weekday()
+
+    @property
+    async def current_streak(self) -> int:
+        """
+        :return: number of consecutive days up to today with contributions
+        """
+        return (await self.daily_contributions).current_streak()
+
+    @property
+    async def longest_streak(self) -> int:
+        """
+        :return: most consecutive days with contributions
+        """
+        return (await self.daily_contributions).longest_streak()
+
+    async def get_commit_repos(self) -> None:
+        """
+        Get the repositories the user has committed to in any year, so that the
+        planner can skip contributor statistics of all other repositories
+        """
+        years = await self.contribution_years
+        if not years:
+            return
         by_year = (
-            (await self.queries.query(Queries.all_contribs(years)))
+            (await self.queries.query(Queries.all_commit_repos(years)))
             .get("data", {})
             .get("viewer", {})
-            .values()
         )
-        for year in by_year:
-            self._total_contributions += year.get("contributionCalendar", {}).get(
-                "totalContributions", 0
+        if len(by_year) == len(years):
+            self.planner.record_commits(by_year.values())
+
+    @staticmethod
+    def _year_is_final(year: int) -> bool:
+        """
+        :param year: calendar year
+        :return: whether contributions in that year can no longer change
+        """
+        today = date.today()
+        if year == today.year - 1:
+            # Late contributions can still land right after New Year
+            return today.timetuple().tm_yday > YEAR_SETTLE_DAYS
+        return year < today.year
+
+    async def get_total_contributions(self) -> None:
+        """
+        Get the user's total contributions across all years. Totals of years
+        that are over are kept between runs, so only recent years are queried.
+        Sets _total_contributions
+        """
+        years = await self.contribution_years
+        final_years: Dict[str, int] = self.state.load("contributions_by_year", {})
+        by_year = {year: final_years[year] for year in years if year in final_years}
+        missing = [year for year in years if year not in by_year]
+        if missing:
+            fetched = (
+                (await self.queries.query(Queries.all_contribs(missing)))
+                .get("data", {})
+                .get("viewer", {})
             )
-        return cast(int, self._total_contributions)
+            for year in missing:
+                if f"year{year}" not in fetched:
+                    continue
+                by_year[year] = (
+                    fetched[f"year{year}"]
+                    .get("contributionCalendar", {})
+                    .get("totalContributions", 0)
+                )
+                if self._year_is_final(int(year)):
+                    final_years[year] = by_year[year]
+            self.state.save("contributions_by_year", final_years)
+
+        total_contributions = sum(by_year.values())
+        self._total_contributions = total_contributions
 
     @property
-    async def lines_changed(self) -> Tuple[int, int]:
+    async def total_contributions(self) -> int:
         """
-        :return: count of total lines added, removed, or modified by the user
+        :return: count of user's total contributions as defined by GitHub
         """
-        if self._lines_changed is not None:
-            return self._lines_changed
-        additions = 0
-        deletions = 0
-        for repo in await self.repos:
-            r = await self.queries.query_rest(f"/repos/{repo}/stats/contributors")
-            for author_obj in r:
-                # Handle malformed response from the API by skipping this repo
-                if not isinstance(author_obj, dict) or not isinstance(
-                    author_obj.get("author", {}), dict
-                ):
+        if self._total_contributions is not None:
+            return self._total_contributions
+        await self._single_flight(
+            "total_contributions", self.get_total_contributions
+        )
+        return cast(int, self._total_contributions)
+
+    def _user_weeks(self, contributors: Any) -> Dict[str, List[int]]:
+        """
+        :param contributors: output of /repos/{repo}/stats/contributors
+        :return: lines added and removed by the user in one repository, keyed
+                 by the (string) timestamp of each week
+        """
+        weeks: Dict[str, List[int]] = dict()
+        if not isinstance(contributors, list):
+            return weeks
+        for author_obj in contributors:
+            # Handle malformed response from the API by skipping this repo
+            if not isinstance(author_obj, dict) or not isinstance(
+                author_obj.get("author", {}), dict
+            ):
+                continue
+            author = author_obj.get("author", {}).get("login", "")
+            if author != self.username:
+                continue
+
+            for week in author_obj.get("weeks", []):
+                additions = week.get("a", 0)
+                deletions = week.get("d", 0)
+                if additions or deletions:
+                    weeks[str(week.get("w", 0))] = [additions, deletions]
+        return weeks
+
+    async def get_lines_changed(self) -> None:
+        """
+        Get the lines added and removed by the user across all repositories.
+        Weekly totals are kept between runs, so only repositories pushed to
+        since the previous run are fetched again. Sets _lines_changed
+        """
+        # Maps repository name to its pushedAt and its weekly [additions,
+        # deletions] by the user as of that push
+        known: Dict[str, Dict[str, Any]] = self.state.load("lines_changed", {})
+        stale: Dict[str, str] = dict()
+        plan = asyncio.ensure_future(
+            self._single_flight("commit_repos", self.get_commit_repos)
+        )
+
+        async def stale_paths() -> AsyncIterator[str]:
+            async for repo in self.iter_repos():
+                if repo in known and known[repo].get(
+                    "pushed_at"
+                ) == self._pushed_at.get(repo):
                     continue
-                author = author_obj.get("author", {}).get("login", "")
-                if author != self.username:
+                await plan
+                if not self.planner.wants_contributor_stats(repo):
+                    # The user has no commits there, so there is nothing to add
+                    known[repo] = {
+                        "pushed_at": self._pushed_at.get(repo),
+                        "weeks": dict(),
+                    }
                     continue
+                stale[f"/repos/{repo}/stats/contributors"] = repo
+                yield f"/repos/{repo}/stats/contributors"
 
-                for week in author_obj.get("weeks", []):
-                    additions += week.get("a", 0)
-                    deletions += week.get("d", 0)
+        # Stale repositories are requested as soon as they are listed;
+        # Queries.semaphore bounds how many requests are actually in flight.
+        # Repositories that miss the deadline or fail keep their previous weeks
+        # and are retried on the next run.
+        async for path, status, r in self.queries.query_rest_stats(
+            stale_paths(), revalidate=True
+        ):
+            if status != 200 or not isinstance(r, list):
+                continue
+            known[stale[path]] = {
+                "pushed_at": self._pushed_at.get(stale[path]),
+                "weeks": self._user_weeks(r),
+            }
 
+        repos = await self.repos
+        known = {repo: data for repo, data in known.items() if repo in repos}
+        self.state.save("lines_changed", known)
+        additions = 0
+        deletions = 0
+        for data in known.values():
+            for week_additions, week_deletions in data.get("weeks", {}).values():
+                additions += week_additions
+                deletions += week_deletions
         self._lines_changed = (additions, deletions)
+
+    @property
+    async def lines_changed(self) -> Tuple[int, int]:
+        """
+        :return: count of total lines added, removed, or modified by the user
+        """
+        if self._lines_changed is not None:
+            return self._lines_changed
+        await self._single_flight("lines_changed", self.get_lines_changed)
+        assert self._lines_changed is not None
         return self._lines_changed
 
+    async def get_issue_counts(self) -> None:
+        """
+        Count issues and pull requests opened by the user across GitHub, using
+        search counts sent together in one batched query. Sets _issue_counts
+        """
+        searches = {
+            "issues_created": f"author:{self.username} is:issue",
+            "issues_closed": f"author:{self.username} is:issue is:closed",
+            "pull_requests": f"author:{self.username} is:pr",
+        }
+        results = await self.batcher.run(
+            [Queries.search_count(search) for search in searches.values()]
+        )
+        self._issue_counts = {
+            key: (result or {}).get("issueCount", 0)
+            for key, result in zip(searches, results)
+        }
+
     @property
-    async def views(self) -> int:
+    async def issue_counts(self) -> Dict[str, int]:
         """
-        Note: only returns views for the last 14 days (as-per GitHub API)
-        :return: total number of page views the user's projects have received
+        :return: number of issues created and closed, and pull requests opened,
+                 by the user
         """
-        if self._views is not None:
-            return self._views
+        if self._issue_counts is not None:
+            return self._issue_counts
+        await self._single_flight("issue_counts", self.get_issue_counts)
+        assert self._issue_counts is not None
+        return self._issue_counts
+
+    async def get_views(self) -> None:
+        """
+        Get the page views of all repositories over the last 14 days. Sets
+        _views
+        """
+        # Traffic is only visible with push access. Repositories that were
+        # forbidden before are skipped until NO_ACCESS_RETRY_AFTER has passed.
+        no_access: Dict[str, float] = self.state.load("no_traffic_access", {})
+        now = time.time()
 
+        async def repo_views(repo: str) -> Tuple[str, int, bool, Any]:
+            status, headers, r = await self.queries.query_rest_once(
+                f"/repos/{repo}/traffic/views"
+            )
+            return repo, status, RateLimiter.is_limited(status, headers), r
+
+        # Requests start as soon as each repository is listed
+        fetches = [
+            asyncio.ensure_future(repo_views(repo))
+            async for repo in self.iter_repos()
+            if self.planner.wants_traffic(repo)
+            and now - no_access.get(repo, 0) > NO_ACCESS_RETRY_AFTER
+        ]
         total = 0
-        for repo in await self.repos:
-            r = await self.queries.query_rest(f"/repos/{repo}/traffic/views")
+        for next_result in asyncio.as_completed(fetches):
+            repo, status, limited, r = await next_result
+            if limited:
+                # Rate limited even after retrying; try again on the next run
+                continue
+            if status == 403:
+                no_access[repo] = now
+                continue
+            no_access.pop(repo, None)
+            if not isinstance(r, dict):
+                continue
             for view in r.get("views", []):
                 total += view.get("count", 0)
 
+        self.state.save("no_traffic_access", no_access)
         self._views = total
-        return total
+
+    @property
+    async def views(self) -> int:
+        """
+        Note: only returns views for the last 14 days (as-per GitHub API)
+        :return: total number of page views the user's projects have received
+        """
+        if self._views is not None:
+            return self._views
+        await self._single_flight("views", self.get_views)
+        assert self._views is not None
+        return self._views
 
 
 ###############################################################################
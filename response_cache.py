@@ -0,0 +1,433 @@
+#!/usr/bin/python3
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# Seconds a response stays fresh (served without touching the network) for each
+# class of endpoint. None means forever; 0 means always revalidate.
+DEFAULT_TTLS: Dict[str, Optional[float]] = {
+    "contributor_stats": 24 * 60 * 60,
+    "traffic": 60 * 60,
+    "graphql_overview": 15 * 60,
+    "past_contributions": None,
+    "graphql": 15 * 60,
+    "rest": 15 * 60,
+}
+# Least recently used responses are evicted once the cache grows past this
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Reads whose access times are written in a single commit
+ACCESS_BATCH_SIZE = 100
+
+
+################################################################################
+# Main Classes
+################################################################################
+
+
+class ResponseCache(object):
+    """
+    On-disk (SQLite) store of GitHub API responses, keyed by URL, query
+    parameters and the scope (e.g., access token) they were requested with.
+    Validators (ETag and Last-Modified) are kept alongside each body so that
+    later requests can be made conditional, and each response stays fresh
+    for a time-to-live that depends on its class of endpoint.
+    """
+
+    # Bump whenever the table layout changes; stale caches are rebuilt
+    SCHEMA_VERSION = 2
+
+    def __init__(
+        self,
+        path: str,
+        ttls: Optional[Dict[str, Optional[float]]] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls is not None:
+            self.ttls.update(ttls)
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.db = sqlite3.connect(path)
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != (
+            self.SCHEMA_VERSION
+        ):
+            self.db.execute("DROP TABLE IF EXISTS responses")
+            self.db.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        self.db.execute(
+            """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    body TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    expires_at REAL,
+    accessed_at REAL NOT NULL
+)
+"""
+        )
+        self.db.commit()
+        # Running total of cached body sizes, so that writes only scan the
+        # table when there is something to evict
+        self._size: int = self.db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        # Access times of reads, written along with the next write instead of
+        # committing on every read
+        self._accessed: Dict[str, float] = dict()
+
+    @staticmethod
+    def key(
+        url: str,
+        params: Optional[Iterable[Tuple[str, Any]]] = None,
+        scope: str = "",
+    ) -> str:
+        """
+        :param url: URL of the request
+        :param params: query parameters (or GraphQL query) of the request
+        :param scope: identifies who makes the request (e.g., a hash of the
+                      access token), since responses depend on what they can
+                      see and must not be served to anyone else
+        :return: cache key identifying the request
+        """
+        query = "&".join(f"{k}={v}" for k, v in sorted(params or ()))
+        return hashlib.sha256(f"{scope}:{url}?{query}".encode()).hexdigest()
+
+    @staticmethod
+    def endpoint_class(url: str, graphql_query: Optional[str] = None) -> str:
+        """
+        :param url: URL of the request
+        :param graphql_query: GraphQL query sent with the request, if any
+        :return: class of endpoint the request belongs to, which determines
+                 how long its response stays fresh
+        """
+        if graphql_query is not None:
+            if re.search(r"repositories(ContributedTo)?\(|nodes\(ids", graphql_query):
+                return "graphql_overview"
+            starts = re.findall(r"from: ", graphql_query)
+            ends = re.findall(r'to: "(\d{4}-\d{2}-\d{2})', graphql_query)
+            # Ranges without an end run until now, so they keep changing
+            if (
+                starts
+                and len(ends) == len(starts)
+                and max(ends) <= f"{datetime.now().year}-01-01"
+            ):
+                # Contributions in years that have ended no longer change
+                return "past_contributions"
+            return "graphql"
+        if url.endswith("/stats/contributors"):
+            return "contributor_stats"
+        if "/traffic/" in url:
+            return "traffic"
+        return "rest"
+
+    def _expires_at(self, endpoint: str) -> Optional[float]:
+        """
+        :param endpoint: class of endpoint a response belongs to
+        :return: time at which a response fetched now stops being fresh
+        """
+        ttl = self.ttls.get(endpoint, self.ttls["rest"])
+        return None if ttl is None else time.time() + ttl
+
+    def _flush_accessed(self) -> None:
+        """
+        Write pending access times as part of the current transaction
+        """
+        if self._accessed:
+            self.db.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._accessed.items()],
+            )
+            self._accessed.clear()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        :param key: cache key identifying the request
+        :return: cached body and metadata, or None if nothing is cached
+        """
+        row = self.db.execute(
+            "SELECT etag, last_modified, body, fetched_at, expires_at "
+            "FROM responses WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, body, fetched_at, expires_at = row
+        self._accessed[key] = time.time()
+        if len(self._accessed) >= ACCESS_BATCH_SIZE:
+            self._flush_accessed()
+            self.db.commit()
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "body": json.loads(body),
+            "fetched_at": fetched_at,
+            "fresh": expires_at is None or expires_at > time.time(),
+        }
+
+    def get_fresh(self, key: str) -> Optional[Any]:
+        """
+        :param key: cache key identifying the request
+        :return: cached body if it is still within its time-to-live, else None
+        """
+        entry = self.get(key)
+        if entry is None or not entry["fresh"]:
+            return None
+        return entry["body"]
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """
+        :param entry: cached body and metadata, as returned by get
+        :return: headers that make the request conditional on the cached copy
+        """
+        headers: Dict[str, str] = dict()
+        if entry is None:
+            return headers
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(
+        self,
+        key: str,
+        url: str,
+        body: Any,
+        endpoint: str = "rest",
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        """
+        Store a response, replacing any previous copy
+        :param key: cache key identifying the request
+        :param url: URL of the request (kept for inspection only)
+        :param body: deserialized JSON body of the response
+        :param endpoint: class of endpoint the request belongs to
+        :param etag: value of the ETag response header
+        :param last_modified: value of the Last-Modified response header
+        """
+        serialized = json.dumps(body)
+        now = time.time()
+        row = self.db.execute(
+            "SELECT size FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        self._size += len(serialized) - (0 if row is None else row[0])
+        self._flush_accessed()
+        self.db.execute(
+            "INSERT OR REPLACE INTO responses (key, url, endpoint, etag, "
+            "last_modified, body, size, fetched_at, expires_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                url,
+                endpoint,
+                etag,
+                last_modified,
+                serialized,
+                len(serialized),
+                now,
+                self._expires_at(endpoint),
+                now,
+            ),
+        )
+        self.db.commit()
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def touch(self, key: str) -> None:
+        """
+        Mark a cached response as revalidated (e.g., after a 304 response),
+        which starts a new time-to-live for it
+        :param key: cache key identifying the request
+        """
+        row = self.db.execute(
+            "SELECT endpoint FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return
+        now = time.time()
+        self._flush_accessed()
+        self.db.execute(
+            "UPDATE responses SET fetched_at = ?, expires_at = ?, accessed_at = ? "
+            "WHERE key = ?",
+            (now, self._expires_at(row[0]), now, key),
+        )
+        self.db.commit()
+
+    def size(self) -> int:
+        """
+        :return: total size in bytes of all cached bodies
+        """
+        return self._size
+
+    def evict(self) -> int:
+        """
+        Drop least recently used responses until the cache fits in max_bytes
+        :return: number of responses dropped
+        """
+        excess = self._size - self.max_bytes
+        dropped = 0
+        if excess <= 0:
+            return dropped
+        self._flush_accessed()
+        rows = self.db.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at ASC"
+        ).fetchall()
+        for key, size in rows:
+            if excess <= 0:
+                break
+            self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            excess -= size
+            self._size -= size
+            dropped += 1
+        self.db.commit()
+        return dropped
+
+    def purge(self, endpoint: Optional[str] = None, expired_only: bool = False) -> int:
+        """
+        Delete cached responses
+        :param endpoint: only delete responses of this class of endpoint
+        :param expired_only: only delete responses past their time-to-live
+        :return: number of responses deleted
+        """
+        conditions = []
+        args: List[Any] = []
+        if endpoint is not None:
+            conditions.append("endpoint = ?")
+            args.append(endpoint)
+        if expired_only:
+            conditions.append("expires_at IS NOT NULL AND expires_at <= ?")
+            args.append(time.time())
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        deleted = self.db.execute(f"DELETE FROM responses{where}", args).rowcount
+        self._size = self.db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        self.db.commit()
+        self.db.execute("VACUUM")
+        return deleted
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        :return: number of responses, total size and number of expired
+                 responses for each class of endpoint
+        """
+        rows = self.db.execute(
+            "SELECT endpoint, COUNT(*), SUM(size), "
+            "SUM(expires_at IS NOT NULL AND expires_at <= ?) "
+            "FROM responses GROUP BY endpoint ORDER BY endpoint",
+            (time.time(),),
+        ).fetchall()
+        return {
+            endpoint: {"entries": entries, "bytes": size, "expired": expired}
+            for endpoint, entries, size, expired in rows
+        }
+
+    def entries(self, endpoint: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        :param endpoint: only list responses of this class of endpoint
+        :return: metadata of every cached response, most recently used first
+        """
+        where = "" if endpoint is None else " WHERE endpoint = ?"
+        rows = self.db.execute(
+            "SELECT url, endpoint, size, fetched_at, expires_at, etag "
+            f"FROM responses{where} ORDER BY accessed_at DESC",
+            () if endpoint is None else (endpoint,),
+        ).fetchall()
+        return [
+            {
+                "url": url,
+                "endpoint": endpoint_class,
+                "bytes": size,
+                "fetched_at": fetched_at,
+                "expires_at": expires_at,
+                "etag": etag,
+            }
+            for url, endpoint_class, size, fetched_at, expires_at, etag in rows
+        ]
+
+    def close(self) -> None:
+        """
+        Write pending access times and close the underlying database
+        connection
+        """
+        self._flush_accessed()
+        self.db.commit()
+        self.db.close()
+
+
+################################################################################
+# Main Function
+################################################################################
+
+
+def main() -> None:
+    """
+    Inspect or purge the response cache from the command line
+    """
+    parser = argparse.ArgumentParser(description="Manage the GitHub response cache")
+    parser.add_argument(
+        "--path",
+        default=os.path.join(os.getenv("CACHE_DIR", ".cache"), "responses.sqlite"),
+        help="path of the cache database",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="summarize the cache by endpoint class")
+    list_parser = commands.add_parser("list", help="list cached responses")
+    list_parser.add_argument("--endpoint", help="only list this endpoint class")
+    purge_parser = commands.add_parser("purge", help="delete cached responses")
+    purge_parser.add_argument("--endpoint", help="only purge this endpoint class")
+    purge_parser.add_argument(
+        "--expired", action="store_true", help="only purge expired responses"
+    )
+    args = parser.parse_args()
+
+    cache = ResponseCache(args.path)
+    try:
+        if args.command == "stats":
+            for endpoint, info in cache.summary().items():
+                print(
+                    f"{endpoint:<20} {info['entries']:>6} entries "
+                    f"{info['bytes']:>12,} bytes {info['expired']:>6} expired"
+                )
+            print(f"{'total':<20} {cache.size():>27,} bytes")
+        elif args.command == "list":
+            for entry in cache.entries(args.endpoint):
+                fetched = datetime.fromtimestamp(entry["fetched_at"])
+                expires = (
+                    "never"
+                    if entry["expires_at"] is None
+                    else datetime.fromtimestamp(entry["expires_at"]).isoformat(
+                        sep=" ", timespec="seconds"
+                    )
+                )
+                print(
+                    f"{entry['endpoint']:<20} {entry['bytes']:>10,} "
+                    f"{fetched.isoformat(sep=' ', timespec='seconds')} "
+                    f"(expires {expires}) {entry['url']}"
+                )
+        elif args.command == "purge":
+            deleted = cache.purge(args.endpoint, expired_only=args.expired)
+            print(f"Purged {deleted} cached responses")
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()